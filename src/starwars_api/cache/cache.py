@@ -1,41 +1,197 @@
 from contextlib import asynccontextmanager
+import asyncio
 import os
-import json
+import random
+import uuid
 import redis.asyncio as redis
-from typing import Any, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+from starwars_api.cache.codec import CacheCodec
+
+# Libera o lock somente se ele ainda pertence a quem o adquiriu
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+# Renova a validade do lock somente se ele ainda pertence a quem o adquiriu
+_EXTEND_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("expire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisLock:
+    def __init__(
+        self,
+        cache: "RedisCache",
+        name: str,
+        expire: int = 30,
+        wait: float = 0.0,
+        poll_interval: float = 0.05,
+        token: Optional[str] = None,
+    ):
+        self.cache = cache
+        self.key = f"lock:{name}"
+        self.expire = expire
+        self.wait = wait
+        self.poll_interval = poll_interval
+        # token conhecido permite liberar o lock de um dono que morreu
+        self.token = token or uuid.uuid4().hex
+        self.acquired = token is not None
+        self.waited = False
+        self.error: Optional[Exception] = None
+
+    async def _try_acquire(self) -> bool:
+        if not self.cache.connection:
+            await self.cache.connect()
+        return bool(
+            await self.cache.connection.set(self.key, self.token, ex=self.expire, nx=True)
+        )
+
+    async def acquire(self) -> bool:
+        try:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.wait
+            self.acquired = await self._try_acquire()
+            while not self.acquired and loop.time() < deadline:
+                self.waited = True
+                await asyncio.sleep(self.poll_interval)
+                self.acquired = await self._try_acquire()
+        except Exception as e:
+            # Sem Redis não há coordenação; quem chamou segue sem o lock e
+            # consegue diferenciar "ocupado" de "Redis fora" por self.error
+            self.acquired = False
+            self.error = e
+        return self.acquired
+
+    async def extend(self) -> bool:
+        if not self.acquired:
+            return False
+        try:
+            return bool(
+                await self.cache.connection.eval(
+                    _EXTEND_LOCK_SCRIPT, 1, self.key, self.token, self.expire
+                )
+            )
+        except Exception:
+            return False
+
+    async def release(self):
+        if self.acquired:
+            try:
+                await self.cache.connection.eval(_RELEASE_LOCK_SCRIPT, 1, self.key, self.token)
+            except Exception:
+                pass  # o lock expira sozinho após self.expire
+            self.acquired = False
+
+    async def __aenter__(self) -> "RedisLock":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.release()
+        return False
+
 
 class RedisCache:
-    def __init__(self):
-        self.redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        health_check_interval: Optional[int] = None,
+        codec: Optional[CacheCodec] = None,
+        ttl_jitter: Optional[float] = None,
+    ):
+        self.redis_url = redis_url or os.getenv("REDIS_URL", "redis://localhost:6379")
+        self.max_connections = max_connections or int(
+            os.getenv("REDIS_MAX_CONNECTIONS", "20")
+        )
+        self.health_check_interval = health_check_interval or int(
+            os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30")
+        )
+        self.codec = codec or CacheCodec()
+        # Fração máxima somada aleatoriamente ao TTL, para que chaves gravadas
+        # juntas (ex.: warm-up) não expirem todas no mesmo instante
+        self.ttl_jitter = (
+            ttl_jitter if ttl_jitter is not None else float(os.getenv("CACHE_TTL_JITTER", "0.1"))
+        )
+        self.pool = None
         self.connection = None
         self._is_connected = False 
 
     async def connect(self):
         if not self.connection:
             try:
-                self.connection = await redis.from_url(
+                self.pool = redis.ConnectionPool.from_url(
                     self.redis_url,
+                    max_connections=self.max_connections,
+                    health_check_interval=self.health_check_interval,
                     socket_timeout=2,
-                    socket_connect_timeout=2
+                    socket_connect_timeout=2,
                 )
+                self.connection = redis.Redis(connection_pool=self.pool)
                 await self.connection.ping()
+                self._is_connected = True
                 return True
             except Exception as e:
-                self.connection = None
+                await self.disconnect()
                 raise ConnectionError(f"Redis connection failed: {str(e)}")
         return True
 
     async def disconnect(self):
         if self.connection:
-            await self.connection.close()
+            await self.connection.aclose()
             self.connection = None
+        if self.pool:
+            await self.pool.disconnect()
+            self.pool = None
+        self._is_connected = False
+
+    def pool_stats(self) -> Dict[str, Any]:
+        if not self.pool:
+            return {"connected": False, "max_connections": self.max_connections}
+        available = len(self.pool._available_connections)
+        in_use = len(self.pool._in_use_connections)
+        return {
+            "connected": self._is_connected,
+            "max_connections": self.max_connections,
+            "health_check_interval": self.health_check_interval,
+            "created_connections": available + in_use,
+            "available_connections": available,
+            "in_use_connections": in_use,
+        }
+
+    def _jittered(self, expire: int, jitter: Optional[int] = None) -> int:
+        spread = int(expire * self.ttl_jitter) if jitter is None else jitter
+        return expire + random.randint(0, spread) if spread > 0 else expire
+
+    def lock(
+        self, name: str, expire: int = 30, wait: float = 0.0, token: Optional[str] = None
+    ) -> RedisLock:
+        return RedisLock(self, name, expire=expire, wait=wait, token=token)
+
+    def _serialize(self, value: Union[str, bytes, dict, list]) -> bytes:
+        return self.codec.encode(value)
+
+    def _deserialize(self, value) -> Optional[Any]:
+        try:
+            return self.codec.decode(value)
+        except Exception:
+            # Formato desconhecido ou corrompido é tratado como cache miss
+            return None
 
-    async def set(self, key: str, value: Union[str, dict, list], expire: int = 3600) -> bool:
+    async def set(self, key: str, value: Union[str, bytes, dict, list], expire: int = 3600, jitter: Optional[int] = None) -> bool:
         try:
             if not self.connection:
                 await self.connect()
-            serialized = json.dumps(value) if isinstance(value, (dict, list)) else value
-            return await self.connection.set(key, serialized, ex=expire)
+            return await self.connection.set(
+                key, self._serialize(value), ex=self._jittered(expire, jitter)
+            )
         except Exception:
             return False
 
@@ -43,16 +199,117 @@ class RedisCache:
         try:
             if not self.connection:
                 await self.connect()
-            value = await self.connection.get(key)
-            if value:
-                try:
-                    return json.loads(value)
-                except json.JSONDecodeError:
-                    return value.decode() if isinstance(value, bytes) else value
-            return None
+            return self._deserialize(await self.connection.get(key))
         except Exception:
             return None
 
+    async def get_with_ttl(self, key: str) -> Tuple[Optional[Any], int]:
+        # GET + TTL no mesmo pipeline; TTL -2 = chave ausente, -1 = sem expiração
+        try:
+            if not self.connection:
+                await self.connect()
+            async with self.connection.pipeline(transaction=False) as pipe:
+                pipe.get(key)
+                pipe.ttl(key)
+                value, ttl = await pipe.execute()
+            return self._deserialize(value), ttl
+        except Exception:
+            return None, -2
+
+    async def delete(self, *keys: str) -> int:
+        if not keys:
+            return 0
+        try:
+            if not self.connection:
+                await self.connect()
+            return await self.connection.delete(*keys)
+        except Exception:
+            return 0
+
+    async def get_many(self, keys: List[str]) -> List[Optional[Any]]:
+        if not keys:
+            return []
+        try:
+            if not self.connection:
+                await self.connect()
+            values = await self.connection.mget(keys)
+            return [self._deserialize(value) for value in values]
+        except Exception:
+            return [None] * len(keys)
+
+    async def set_many(
+        self,
+        mapping: Dict[str, Union[str, dict, list]],
+        expire: int = 3600,
+        jitter: Optional[int] = None,
+    ) -> bool:
+        # Pipeline sem transação: uma única ida ao Redis para todas as chaves
+        if not mapping:
+            return True
+        try:
+            if not self.connection:
+                await self.connect()
+            async with self.connection.pipeline(transaction=False) as pipe:
+                for key, value in mapping.items():
+                    pipe.set(key, self._serialize(value), ex=self._jittered(expire, jitter))
+                await pipe.execute()
+            return True
+        except Exception:
+            return False
+
+    async def expire_many(self, keys: List[str], expire: int = 3600, jitter: Optional[int] = None) -> List[str]:
+        # Renova o TTL de chaves existentes sem reenviar os valores. Devolve as
+        # chaves que não existem mais (EXPIRE = 0), que precisam ser regravadas
+        if not keys:
+            return []
+        try:
+            if not self.connection:
+                await self.connect()
+            async with self.connection.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.expire(key, self._jittered(expire, jitter))
+                results = await pipe.execute()
+            return [key for key, renewed in zip(keys, results) if not renewed]
+        except Exception:
+            # Sem confirmação do Redis, nenhuma chave é considerada renovada
+            return list(keys)
+
+    async def scan_keys(self, match: str = "*", count: int = 1000) -> List[str]:
+        if not self.connection:
+            await self.connect()
+        keys = []
+        async for key in self.connection.scan_iter(match=match, count=count):
+            keys.append(key.decode("utf-8") if isinstance(key, bytes) else key)
+        return keys
+
+    async def dump_many(self, keys: List[str]) -> List[Tuple[Optional[bytes], int]]:
+        # Valores como estão no Redis (já codificados) + TTL restante em ms
+        if not keys:
+            return []
+        if not self.connection:
+            await self.connect()
+        async with self.connection.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.get(key)
+                pipe.pttl(key)
+            results = await pipe.execute()
+        return list(zip(results[::2], results[1::2]))
+
+    async def restore_many(self, records: List[Tuple[str, bytes, int]]) -> bool:
+        # Grava valores já codificados sem passar pelo codec; ttl <= 0 = sem expiração
+        if not records:
+            return True
+        try:
+            if not self.connection:
+                await self.connect()
+            async with self.connection.pipeline(transaction=False) as pipe:
+                for key, value, ttl_ms in records:
+                    pipe.set(key, value, px=ttl_ms if ttl_ms > 0 else None)
+                await pipe.execute()
+            return True
+        except Exception:
+            return False
+
     async def ping(self) -> bool:
         try:
             if not self.connection:
@@ -0,0 +1,5 @@
+from starwars_api.cache.cache import RedisCache
+
+# Pool de conexões único da aplicação. Fica no escopo do módulo para
+# sobreviver entre invocações de um container Lambda aquecido.
+redis_cache = RedisCache()
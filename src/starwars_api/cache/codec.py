@@ -0,0 +1,170 @@
+import json
+import os
+import zlib
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dependência opcional
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - dependência opcional
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependência opcional
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - dependência opcional
+    lz4_frame = None
+
+# Cabeçalho dos valores gravados pelo codec: MAGIC + id do formato + id da
+# compressão. Valores sem o cabeçalho são entradas antigas em JSON/texto puro.
+MAGIC = b"\x00SW"
+HEADER_SIZE = len(MAGIC) + 2
+
+
+class Codec:
+    def __init__(
+        self,
+        codec_id: int,
+        name: str,
+        dumps: Callable[[Any], bytes],
+        loads: Callable[[bytes], Any],
+    ):
+        self.id = codec_id
+        self.name = name
+        self.dumps = dumps
+        self.loads = loads
+
+
+class Compressor:
+    def __init__(
+        self,
+        compressor_id: int,
+        name: str,
+        compress: Callable[[bytes], bytes],
+        decompress: Callable[[bytes], bytes],
+    ):
+        self.id = compressor_id
+        self.name = name
+        self.compress = compress
+        self.decompress = decompress
+
+
+def _json_dumps(value: Any) -> bytes:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+CODECS: Dict[str, Codec] = {"json": Codec(0, "json", _json_dumps, json.loads)}
+if orjson is not None:
+    CODECS["orjson"] = Codec(1, "orjson", orjson.dumps, orjson.loads)
+if msgpack is not None:
+    CODECS["msgpack"] = Codec(
+        2,
+        "msgpack",
+        lambda value: msgpack.packb(value, use_bin_type=True),
+        lambda raw: msgpack.unpackb(raw, raw=False),
+    )
+
+COMPRESSORS: Dict[str, Compressor] = {
+    "none": Compressor(0, "none", lambda raw: raw, lambda raw: raw),
+    "zlib": Compressor(1, "zlib", zlib.compress, zlib.decompress),
+}
+if zstandard is not None:
+    COMPRESSORS["zstd"] = Compressor(
+        2,
+        "zstd",
+        lambda raw: zstandard.ZstdCompressor(level=3).compress(raw),
+        lambda raw: zstandard.ZstdDecompressor().decompress(raw),
+    )
+if lz4_frame is not None:
+    COMPRESSORS["lz4"] = Compressor(3, "lz4", lz4_frame.compress, lz4_frame.decompress)
+
+# Corpo de resposta já serializado: gravado e devolvido como bytes, sem parse
+RAW_BYTES = Codec(3, "raw", bytes, bytes)
+
+_CODECS_BY_ID = {codec.id: codec for codec in [*CODECS.values(), RAW_BYTES]}
+_COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+
+
+def dumps_json(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return _json_dumps(value)
+
+
+def loads_json(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _default_codec() -> str:
+    for name in ("orjson", "msgpack", "json"):
+        if name in CODECS:
+            return name
+    return "json"
+
+
+def _default_compression() -> str:
+    return "zstd" if "zstd" in COMPRESSORS else "zlib"
+
+
+class CacheCodec:
+    def __init__(
+        self,
+        codec: Optional[str] = None,
+        compression: Optional[str] = None,
+        compression_threshold: Optional[int] = None,
+    ):
+        codec = codec or os.getenv("CACHE_CODEC") or _default_codec()
+        compression = (
+            compression or os.getenv("CACHE_COMPRESSION") or _default_compression()
+        )
+        if codec not in CODECS:
+            raise ValueError(f"Codec indisponível: {codec}")
+        if compression not in COMPRESSORS:
+            raise ValueError(f"Compressão indisponível: {compression}")
+
+        self.codec = CODECS[codec]
+        self.compressor = COMPRESSORS[compression]
+        self.compression_threshold = (
+            compression_threshold
+            if compression_threshold is not None
+            else int(os.getenv("CACHE_COMPRESSION_THRESHOLD", "1024"))
+        )
+
+    def encode(self, value: Any) -> bytes:
+        # bytes são tratados como payload pronto (ex.: corpo JSON da resposta)
+        codec = RAW_BYTES if isinstance(value, (bytes, bytearray)) else self.codec
+        payload = codec.dumps(value)
+        compressor = COMPRESSORS["none"]
+        if len(payload) >= self.compression_threshold:
+            compressor = self.compressor
+            payload = compressor.compress(payload)
+        return MAGIC + bytes((codec.id, compressor.id)) + payload
+
+    def decode(self, raw: Any) -> Optional[Any]:
+        if not raw:
+            return None
+        if isinstance(raw, str):
+            raw = raw.encode("utf-8")
+        if raw[: len(MAGIC)] == MAGIC:
+            codec = _CODECS_BY_ID[raw[len(MAGIC)]]
+            compressor = _COMPRESSORS_BY_ID[raw[len(MAGIC) + 1]]
+            return codec.loads(compressor.decompress(raw[HEADER_SIZE:]))
+        return self._decode_legacy(raw)
+
+    @staticmethod
+    def _decode_legacy(raw: bytes) -> Any:
+        # Entradas gravadas antes do codec: JSON ou texto puro
+        try:
+            return json.loads(raw)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return raw.decode("utf-8", errors="replace")
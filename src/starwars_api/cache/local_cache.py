@@ -0,0 +1,76 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class LocalNameCache:
+    def __init__(self, max_size: int = 2048, ttl: float = 3600.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return None
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, str]:
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: str, value: Optional[str]):
+        if value is None or self.max_size <= 0:
+            return
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        # Remove as entradas menos usadas quando o limite é atingido
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def set_many(self, mapping: Dict[str, Optional[str]]):
+        for key, value in mapping.items():
+            self.set(key, value)
+
+    def delete_many(self, keys: Iterable[str]):
+        for key in keys:
+            self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+name_cache = LocalNameCache(
+    max_size=int(os.getenv("NAME_CACHE_MAX_SIZE", "2048")),
+    ttl=float(os.getenv("NAME_CACHE_TTL", "3600")),
+)
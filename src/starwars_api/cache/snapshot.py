@@ -0,0 +1,163 @@
+import argparse
+import asyncio
+import re
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from starwars_api.cache.cache import RedisCache
+from starwars_api.cache.codec import COMPRESSORS
+
+# Arquivo: MAGIC + versão + id da compressão + nº de registros, seguido do
+# corpo comprimido com registros (tamanho da chave, chave, TTL em ms,
+# tamanho do valor, valor). Os valores vão exatamente como estão no Redis.
+SNAPSHOT_MAGIC = b"SWSNAP"
+SNAPSHOT_VERSION = 1
+_HEADER = struct.Struct(">6sBBI")
+_RECORD = struct.Struct(">HqI")
+
+# Só os namespaces do cache entram (e voltam) no snapshot: documentos brutos
+# ({endpoint}, {endpoint}:{id}, URL), nomes, views processadas e fingerprints.
+# Chaves de coordenação (lock:, warmup:job:, warmup:current) ou de terceiros
+# que dividam o Redis ficam de fora.
+_ENDPOINTS = "films|people|planets|species|starships|vehicles"
+RESTORABLE_KEY = re.compile(
+    rf"^(?:(?:name:)?https://swapi\.info/api/(?:{_ENDPOINTS})/[^/]+/?"
+    rf"|(?:{_ENDPOINTS})(?::.*|(?:_[^_:]+)?_processed(?::.*)?)?"
+    r"|warmup:fingerprints)$",
+    re.DOTALL,
+)
+BATCH_SIZE = 500
+
+
+def is_restorable(key: str) -> bool:
+    return bool(RESTORABLE_KEY.match(key))
+
+
+def _compressor():
+    return COMPRESSORS["zstd"] if "zstd" in COMPRESSORS else COMPRESSORS["zlib"]
+
+
+def encode_snapshot(records: List[Tuple[str, bytes, int]]) -> bytes:
+    body = bytearray()
+    for key, value, ttl_ms in records:
+        encoded_key = key.encode("utf-8")
+        body += _RECORD.pack(len(encoded_key), ttl_ms, len(value))
+        body += encoded_key
+        body += value
+    compressor = _compressor()
+    header = _HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, compressor.id, len(records))
+    return header + compressor.compress(bytes(body))
+
+
+def decode_snapshot(data: bytes) -> List[Tuple[str, bytes, int]]:
+    if len(data) < _HEADER.size:
+        raise ValueError("Snapshot inválido: arquivo truncado")
+    magic, version, compressor_id, count = _HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("Snapshot inválido: cabeçalho desconhecido")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"Versão de snapshot não suportada: {version}")
+    compressors = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+    if compressor_id not in compressors:
+        raise ValueError(f"Compressão indisponível: {compressor_id}")
+
+    try:
+        body = compressors[compressor_id].decompress(data[_HEADER.size:])
+        records = []
+        offset = 0
+        for _ in range(count):
+            key_size, ttl_ms, value_size = _RECORD.unpack_from(body, offset)
+            offset += _RECORD.size
+            key = body[offset:offset + key_size].decode("utf-8")
+            offset += key_size
+            value = body[offset:offset + value_size]
+            offset += value_size
+            records.append((key, value, ttl_ms))
+    except Exception as e:
+        raise ValueError(f"Snapshot inválido: {str(e)}")
+    if offset != len(body):
+        raise ValueError("Snapshot inválido: tamanho inconsistente")
+    return records
+
+
+class CacheSnapshot:
+    def __init__(self, redis_cache: RedisCache, batch_size: int = BATCH_SIZE):
+        self.redis = redis_cache
+        self.batch_size = batch_size
+
+    async def export(self) -> Tuple[bytes, Dict[str, Any]]:
+        started = time.perf_counter()
+        keys = [key for key in await self.redis.scan_keys() if is_restorable(key)]
+
+        records = []
+        for i in range(0, len(keys), self.batch_size):
+            batch = keys[i:i + self.batch_size]
+            for key, (value, ttl_ms) in zip(batch, await self.redis.dump_many(batch)):
+                # Chave pode ter expirado entre o SCAN e o GET
+                if value is not None:
+                    records.append((key, value, ttl_ms))
+
+        data = encode_snapshot(records)
+        return data, {
+            "version": SNAPSHOT_VERSION,
+            "keys": len(records),
+            "bytes": len(data),
+            "duration_seconds": round(time.perf_counter() - started, 3),
+        }
+
+    async def load(self, data: bytes) -> Dict[str, Any]:
+        started = time.perf_counter()
+        decoded = decode_snapshot(data)
+        records = [record for record in decoded if is_restorable(record[0])]
+        if len(records) != len(decoded):
+            print(f"Snapshot: {len(decoded) - len(records)} chaves fora dos namespaces ignoradas")
+
+        batches = [
+            records[i:i + self.batch_size]
+            for i in range(0, len(records), self.batch_size)
+        ]
+        results = await asyncio.gather(*[self.redis.restore_many(batch) for batch in batches])
+        loaded = sum(len(batch) for batch, ok in zip(batches, results) if ok)
+
+        return {
+            "status": "completed" if all(results) else "partial",
+            "version": SNAPSHOT_VERSION,
+            "keys": loaded,
+            "skipped_keys": len(decoded) - len(records),
+            "duration_seconds": round(time.perf_counter() - started, 3),
+        }
+
+
+async def _run(command: str, path: str, redis_url: Optional[str]) -> Dict[str, Any]:
+    cache = RedisCache(redis_url=redis_url)
+    await cache.connect()
+    try:
+        snapshot = CacheSnapshot(cache)
+        if command == "export":
+            data, report = await snapshot.export()
+            with open(path, "wb") as file:
+                file.write(data)
+            return report
+        with open(path, "rb") as file:
+            return await snapshot.load(file.read())
+    finally:
+        await cache.disconnect()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="swapi-cache-snapshot",
+        description="Exporta/importa o keyspace do cache Redis em um arquivo de snapshot",
+    )
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("path")
+    parser.add_argument("--redis-url", default=None, help="padrão: REDIS_URL")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_run(args.command, args.path, args.redis_url))
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+import os
+
+# Documentos brutos da SWAPI e chaves name:{url}
+RAW_TTL = 3600
+
+# Resultados processados: após o soft TTL são servidos "stale" enquanto um
+# refresh em background os reconstrói; o hard TTL é a expiração no Redis.
+PROCESSED_SOFT_TTL = int(os.getenv("CACHE_PROCESSED_SOFT_TTL", "1800"))
+PROCESSED_HARD_TTL = int(os.getenv("CACHE_PROCESSED_HARD_TTL", "86400"))
+# Jitter somado ao hard TTL; também espalha o momento em que cada chave fica stale
+PROCESSED_TTL_JITTER = int(
+    PROCESSED_SOFT_TTL * float(os.getenv("CACHE_TTL_JITTER", "0.1"))
+)
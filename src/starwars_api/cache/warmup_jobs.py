@@ -0,0 +1,195 @@
+import asyncio
+import os
+import time
+import uuid
+from typing import Any, Callable, Dict, Optional
+
+from starwars_api.cache.cache import RedisCache, RedisLock
+from starwars_api.cache.warmup_service import CacheWarmupService
+
+# Estado dos jobs fica no Redis para qualquer worker responder o polling
+JOB_TTL = 86400
+CURRENT_JOB_KEY = "warmup:current"
+WARMUP_LOCK_TTL = int(os.getenv("WARMUP_LOCK_TTL", "900"))
+# O job em execução renova updated_at (e o lock) a cada intervalo; sem
+# heartbeat por WARMUP_STALE_AFTER segundos ele é dado como interrompido
+WARMUP_HEARTBEAT_INTERVAL = float(os.getenv("WARMUP_HEARTBEAT_INTERVAL", "15"))
+WARMUP_STALE_AFTER = float(os.getenv("WARMUP_STALE_AFTER", "120"))
+# No Lambda o processo congela depois da resposta: o job roda dentro da própria
+# requisição em vez de numa task de background
+WARMUP_INLINE = os.getenv(
+    "WARMUP_INLINE", "true" if os.getenv("AWS_LAMBDA_FUNCTION_NAME") else "false"
+).lower() in ("1", "true", "yes")
+
+
+class WarmupAlreadyRunning(Exception):
+    def __init__(self, job_id: Optional[str] = None):
+        super().__init__(f"Warm-up já em andamento: {job_id}")
+        self.job_id = job_id
+
+
+def _job_key(job_id: str) -> str:
+    return f"warmup:job:{job_id}"
+
+
+def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+    # O token do lock fica só no Redis, nunca na resposta da API
+    return {key: value for key, value in job.items() if key != "lock_token"}
+
+
+def is_stale(job: Dict[str, Any], now: Optional[float] = None) -> bool:
+    if job.get("status") != "running":
+        return False
+    updated_at = job.get("updated_at") or job.get("started_at") or 0
+    return (now or time.time()) - updated_at > WARMUP_STALE_AFTER
+
+
+def job_progress(job: Dict[str, Any], now: Optional[float] = None) -> Dict[str, Any]:
+    now = now or time.time()
+    endpoints = job.get("endpoints", {})
+    done = [e for e in endpoints.values() if e.get("status") == "done"]
+    items = sum(e.get("total_items", 0) for e in done)
+
+    started_at = job.get("started_at")
+    elapsed = ((job.get("finished_at") or now) - started_at) if started_at else 0.0
+
+    eta = None
+    if job.get("status") == "running" and done:
+        # Estimativa linear pelo número de endpoints concluídos
+        eta = round(elapsed / len(done) * (len(endpoints) - len(done)), 3)
+
+    return {
+        "endpoints_done": len(done),
+        "endpoints_total": len(endpoints),
+        "items_fetched": items,
+        "elapsed_seconds": round(elapsed, 3),
+        "items_per_second": round(items / elapsed, 2) if elapsed > 0 else 0.0,
+        "eta_seconds": eta,
+    }
+
+
+class WarmupJobManager:
+    def __init__(
+        self,
+        redis_cache: RedisCache,
+        service_factory: Callable[..., CacheWarmupService] = CacheWarmupService,
+        inline: Optional[bool] = None,
+    ):
+        self.redis = redis_cache
+        self.service_factory = service_factory
+        self.inline = WARMUP_INLINE if inline is None else inline
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    async def _save(self, job: Dict[str, Any]):
+        job["updated_at"] = time.time()
+        await self.redis.set(_job_key(job["job_id"]), job, expire=JOB_TTL)
+
+    async def _acquire(self) -> RedisLock:
+        # Um único warm-up por vez entre todos os workers
+        lock = self.redis.lock("warmup", expire=WARMUP_LOCK_TTL)
+        if await lock.acquire():
+            return lock
+        if lock.error is not None:
+            raise ConnectionError(f"Redis indisponível: {str(lock.error)}")
+
+        current_id = await self.redis.get(CURRENT_JOB_KEY)
+        current = await self.redis.get(_job_key(current_id)) if current_id else None
+        if current and is_stale(current):
+            # Dono do lock morreu (ou foi congelado): marca o job e tenta de novo
+            await self._expire_stale(current)
+            if await lock.acquire():
+                return lock
+        raise WarmupAlreadyRunning(current_id)
+
+    async def _expire_stale(self, job: Dict[str, Any]):
+        print(f"Warm-up {job['job_id']} sem heartbeat; marcado como failed")
+        job["status"] = "failed"
+        job["error"] = f"Sem heartbeat há mais de {WARMUP_STALE_AFTER:g}s"
+        job["finished_at"] = job.get("updated_at") or time.time()
+        await self.redis.set(_job_key(job["job_id"]), job, expire=JOB_TTL)
+        if job.get("lock_token"):
+            await self.redis.lock("warmup", token=job["lock_token"]).release()
+        if await self.redis.get(CURRENT_JOB_KEY) == job["job_id"]:
+            await self.redis.delete(CURRENT_JOB_KEY)
+
+    async def start(self, incremental: bool = False) -> Dict[str, Any]:
+        lock = await self._acquire()
+
+        warmup = self.service_factory(redis_cache=self.redis)
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": "running",
+            "mode": "incremental" if incremental else "full",
+            "started_at": time.time(),
+            "updated_at": None,
+            "finished_at": None,
+            "endpoints": {endpoint: {"status": "pending"} for endpoint in warmup.endpoints},
+            "report": None,
+            "error": None,
+            "lock_token": lock.token,
+        }
+        try:
+            await self._save(job)
+            await self.redis.set(CURRENT_JOB_KEY, job["job_id"], expire=WARMUP_LOCK_TTL)
+        except Exception:
+            await lock.release()
+            raise
+
+        if self.inline:
+            await self._run(job, warmup, lock, incremental)
+            return _public(job)
+
+        task = asyncio.create_task(self._run(job, warmup, lock, incremental))
+        self._tasks[job["job_id"]] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job["job_id"], None))
+        return _public(job)
+
+    async def _heartbeat(self, job: Dict[str, Any], lock: RedisLock):
+        while True:
+            await asyncio.sleep(WARMUP_HEARTBEAT_INTERVAL)
+            await lock.extend()
+            await self.redis.set(CURRENT_JOB_KEY, job["job_id"], expire=WARMUP_LOCK_TTL)
+            await self._save(job)
+
+    async def _run(
+        self,
+        job: Dict[str, Any],
+        warmup: CacheWarmupService,
+        lock: RedisLock,
+        incremental: bool = False,
+    ):
+        async def on_endpoint(result: Dict[str, Any]):
+            job["endpoints"][result["endpoint"]] = {
+                "status": "failed" if result.get("status") == "failed" else "done",
+                "total_items": result["total_items"],
+                "duration_seconds": result["duration_seconds"],
+            }
+            if result.get("error"):
+                job["endpoints"][result["endpoint"]]["error"] = result["error"]
+            await self._save(job)
+
+        heartbeat = asyncio.create_task(self._heartbeat(job, lock))
+        try:
+            report = await warmup.warm_all(on_endpoint=on_endpoint, incremental=incremental)
+            job["status"] = report["status"]
+            job["report"] = report
+        except Exception as e:
+            print(f"Erro no warm-up {job['job_id']}: {str(e)}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            heartbeat.cancel()
+            job["finished_at"] = time.time()
+            try:
+                await self._save(job)
+                await self.redis.delete(CURRENT_JOB_KEY)
+            finally:
+                await lock.release()
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = await self.redis.get(_job_key(job_id))
+        if not job:
+            return None
+        if is_stale(job):
+            await self._expire_stale(job)
+        return {**_public(job), "progress": job_progress(job)}
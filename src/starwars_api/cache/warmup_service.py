@@ -1,7 +1,27 @@
 import asyncio
-import httpx
-from typing import Dict, List
+import hashlib
+import json
+import math
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
 from starwars_api.cache.cache import RedisCache
+from starwars_api.cache.codec import dumps_json
+from starwars_api.cache.local_cache import name_cache
+from starwars_api.cache.ttl import PROCESSED_HARD_TTL, PROCESSED_TTL_JITTER, RAW_TTL
+from starwars_api.util.entity_graph import EntityGraph, resource_endpoint, resource_id
+from starwars_api.util.http_client import http_client
+from starwars_api.util.rate_limiter import TokenBucket
+
+# Fingerprint (edited + hash do conteúdo) de cada entidade do último warm-up
+FINGERPRINTS_KEY = "warmup:fingerprints"
+
+
+def fingerprint(entity: Dict[str, Any]) -> str:
+    content = json.dumps(entity, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+    return f"{entity.get('edited', '')}:{digest}"
+
 
 class CacheWarmupService:
     def __init__(
@@ -9,13 +29,17 @@ class CacheWarmupService:
         redis_cache: RedisCache,
         api_base_url: str = "https://swapi.info/api/",
         endpoints: List[str] = None,
-        request_delay: float = 0.5,
-        timeout: float = 30.0
+        requests_per_second: Optional[float] = None,
+        timeout: Optional[float] = None
     ):
         self.redis = redis_cache
         self.api_base_url = api_base_url.rstrip('/')
         self.endpoints = endpoints or ["films", "people", "planets", "species", "vehicles", "starships"]
-        self.delay = request_delay
+        # Orçamento de requisições à SWAPI compartilhado por todos os endpoints
+        self.requests_per_second = requests_per_second or float(
+            os.getenv("WARMUP_REQUESTS_PER_SECOND", "5")
+        )
+        self.rate_limiter = TokenBucket(self.requests_per_second)
         self.timeout = timeout
         
         self.resolvable_fields = {
@@ -27,61 +51,294 @@ class CacheWarmupService:
             "starships": ["pilots", "films"]
         }
 
+    async def _get_json(self, url: str) -> Any:
+        await self.rate_limiter.acquire()
+        # timeout None mantém a política padrão do cliente compartilhado
+        request_options = {"timeout": self.timeout} if self.timeout else {}
+        response = await http_client.get(url, **request_options)
+        response.raise_for_status()
+        return response.json()
+
     async def _fetch_all_pages(self, endpoint: str) -> List[Dict]:
-        items = []
+        # Qualquer página com erro propaga a exceção: coleção incompleta não é cacheada
         url = f"{self.api_base_url}/{endpoint}"
-        
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            while url:
-                try:
-                    response = await client.get(url)
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    items.extend(data.get('results', []))
-                    url = data.get('next')
-                    
-                    if url:
-                        await asyncio.sleep(self.delay)
-                except Exception as e:
-                    print(f"Error fetching {url}: {str(e)}")
-                    break
-        
+        data = await self._get_json(url)
+
+        # swapi.info devolve a coleção inteira; o formato paginado (results/next)
+        # do swapi.dev continua suportado
+        if isinstance(data, list):
+            return data
+
+        items = list(data.get('results', []))
+        next_url = data.get('next')
+        count = data.get('count')
+
+        if next_url and count and items:
+            # Com o total conhecido, as páginas restantes são buscadas em paralelo
+            page_count = math.ceil(count / len(items))
+            page_urls = [f"{url}?page={page}" for page in range(2, page_count + 1)]
+            pages = await asyncio.gather(
+                *[self._get_json(page_url) for page_url in page_urls],
+                return_exceptions=True
+            )
+            for page_url, page in zip(page_urls, pages):
+                if isinstance(page, Exception):
+                    print(f"Error fetching {page_url}: {str(page)}")
+                    raise page
+                items.extend(page.get('results', []))
+            return items
+
+        while next_url:
+            data = await self._get_json(next_url)
+            items.extend(data.get('results', []))
+            next_url = data.get('next')
+
         return items
 
 
-    async def warm_endpoint(self, endpoint: str) -> Dict[str, any]:
-        items = await self._fetch_all_pages(endpoint)
-        success_count = 0
-        
-        for item in items:
-            if await self._process_and_cache_item(endpoint, item):
-                success_count += 1
-            await asyncio.sleep(self.delay)  # Delay entre itens
-        
-        return {
+    async def warm_endpoint(self, endpoint: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        try:
+            items, error = await self._fetch_all_pages(endpoint), None
+        except Exception as e:
+            print(f"Error fetching {endpoint}: {str(e)}")
+            items, error = [], str(e)
+        result = {
             "endpoint": endpoint,
+            "status": "failed" if error else "ok",
+            "items": items,
             "total_items": len(items),
-            "cached_items": success_count
+            "duration_seconds": round(time.perf_counter() - started, 3)
         }
+        if error:
+            result["error"] = error
+        return result
+
+    @staticmethod
+    def _references(item: Dict[str, Any], fields: List[str], endpoints: Set[str]) -> bool:
+        # A entidade cita alguma URL de uma das coleções informadas?
+        for field in fields:
+            value = item.get(field)
+            refs = value if isinstance(value, list) else [value]
+            for ref in refs:
+                if isinstance(ref, str) and ref.startswith("http") and resource_endpoint(ref) in endpoints:
+                    return True
+        return False
+
+    def _build_entries(
+        self,
+        graph: EntityGraph,
+        changed: Optional[Set[str]] = None,
+        affected: Optional[Set[str]] = None,
+        failed: Optional[Set[str]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, bytes], List[str], List[str]]:
+        # changed/affected None = escreve tudo; caso contrário só o que mudou
+        # (changed) ou referencia algo que mudou (affected). O restante volta
+        # nas listas de chaves que só precisam ter o TTL renovado.
+        # failed: coleções cuja busca falhou; nada delas é escrito, nem as
+        # views que citam entidades delas (sairiam com nomes None).
+        failed = failed or set()
+        raw_entries: Dict[str, Any] = {}
+        processed_entries: Dict[str, bytes] = {}
+        raw_touch: List[str] = []
+        processed_touch: List[str] = []
+
+        def is_changed(url: str) -> bool:
+            return changed is None or url in changed
+
+        def is_affected(url: str) -> bool:
+            return affected is None or url in affected
+
+        # Entidades removidas também entram aqui: a coleção delas mudou
+        changed_endpoints = {resource_endpoint(url) for url in changed or ()}
+        affected_endpoints = {resource_endpoint(url) for url in affected or ()}
+
+        # Mesmas chaves usadas por SwapiService e url_to_name
+        for url, name in graph.names().items():
+            if is_changed(url):
+                raw_entries[f"name:{url}"] = name
+            else:
+                raw_touch.append(f"name:{url}")
 
-    async def warm_all(self) -> Dict[str, any]:
-        await self.redis.connect()
-        results = []
-        
         for endpoint in self.endpoints:
+            if endpoint in failed:
+                continue
+            items = graph.collections.get(endpoint, [])
+            fields = self.resolvable_fields.get(endpoint, [])
+            urls = [item.get("url") for item in items]
+            list_changed = changed is None or endpoint in changed_endpoints
+            list_affected = affected is None or endpoint in affected_endpoints
+
+            if list_changed:
+                raw_entries[endpoint] = items
+            else:
+                raw_touch.append(endpoint)
+
+            resolved_items = []
+            list_complete = True
+            for item, url in zip(items, urls):
+                resolved = None
+                complete = not failed or not self._references(item, fields, failed)
+                list_complete = list_complete and complete
+                if list_affected or (url and is_affected(url)):
+                    resolved = graph.resolve(item, fields)
+                    resolved_items.append(resolved)
+                if not url:
+                    continue
+                item_id = resource_id(url)
+                if is_changed(url):
+                    raw_entries[url] = item
+                    raw_entries[f"{endpoint}:{item_id}"] = item
+                else:
+                    raw_touch.extend([url, f"{endpoint}:{item_id}"])
+                if not is_affected(url):
+                    processed_touch.append(f"{endpoint}_{item_id}_processed")
+                elif complete:
+                    processed_entries[f"{endpoint}_{item_id}_processed"] = dumps_json(resolved)
+
+            if not list_affected:
+                processed_touch.append(f"{endpoint}_processed")
+            elif list_complete:
+                processed_entries[f"{endpoint}_processed"] = dumps_json(resolved_items)
+
+        return raw_entries, processed_entries, raw_touch, processed_touch
+
+    def _diff(
+        self,
+        graph: EntityGraph,
+        previous: Dict[str, str],
+        fingerprints: Dict[str, str],
+        failed: Optional[Set[str]] = None
+    ):
+        # Só some o que não veio numa busca bem-sucedida; coleções que falharam
+        # não dizem nada sobre quais entidades ainda existem
+        failed = failed or set()
+        removed = {
+            url for url in set(previous) - set(fingerprints)
+            if resource_endpoint(url) not in failed
+        }
+        changed = {url for url, fp in fingerprints.items() if previous.get(url) != fp} | removed
+        # Views que citam uma entidade alterada/removida precisam ser re-resolvidas
+        affected = changed | graph.referrers(changed, self.resolvable_fields)
+        return changed, removed, affected
+
+    @staticmethod
+    def _removed_keys(removed: Set[str]) -> List[str]:
+        keys = []
+        for url in removed:
+            endpoint, item_id = resource_endpoint(url), resource_id(url)
+            keys.extend([
+                url,
+                f"name:{url}",
+                f"{endpoint}:{item_id}",
+                f"{endpoint}_{item_id}_processed"
+            ])
+        return keys
+
+    async def warm_all(
+        self,
+        on_endpoint: Optional[Callable[[Dict[str, Any]], Awaitable]] = None,
+        incremental: bool = False
+    ) -> Dict[str, Any]:
+        await self.redis.connect()
+        started = time.perf_counter()
+
+        async def warm(endpoint: str) -> Dict[str, Any]:
             result = await self.warm_endpoint(endpoint)
-            results.append(result)
-            print(f"Warmed up {endpoint}: {result['cached_items']}/{result['total_items']} items")
-            await asyncio.sleep(self.delay)  # Delay entre endpoints
-        
+            if on_endpoint:
+                await on_endpoint(result)
+            return result
+
+        # Uma busca por coleção; todo o resto sai do grafo em memória
+        results = await asyncio.gather(*[warm(endpoint) for endpoint in self.endpoints])
+        fetched = time.perf_counter()
+
+        collections = {result["endpoint"]: result.pop("items") for result in results}
+        failed = {result["endpoint"] for result in results if result["status"] == "failed"}
+        graph = EntityGraph(
+            {endpoint: items for endpoint, items in collections.items() if endpoint not in failed}
+        )
+        fingerprints = {url: fingerprint(entity) for url, entity in graph.entities.items()}
+
+        changed = removed = affected = None
+        if incremental:
+            previous = await self.redis.get(FINGERPRINTS_KEY)
+            # Sem fingerprints anteriores (primeira execução/expirou) tudo é novo
+            changed, removed, affected = self._diff(
+                graph, previous if isinstance(previous, dict) else {}, fingerprints, failed
+            )
+
+        raw_entries, processed_entries, raw_touch, processed_touch = self._build_entries(
+            graph, changed, affected, failed
+        )
+        built = time.perf_counter()
+
+        raw_missing, processed_missing = await asyncio.gather(
+            self.redis.expire_many(raw_touch, expire=RAW_TTL),
+            self.redis.expire_many(
+                processed_touch,
+                expire=PROCESSED_HARD_TTL,
+                jitter=PROCESSED_TTL_JITTER
+            )
+        )
+        if raw_missing or processed_missing:
+            # EXPIRE não recria chaves que já expiraram: elas são regravadas
+            # a partir do grafo, mesmo sem mudança no fingerprint
+            all_raw, all_processed, _, _ = self._build_entries(graph, failed=failed)
+            raw_entries.update({key: all_raw[key] for key in raw_missing if key in all_raw})
+            processed_entries.update(
+                {key: all_processed[key] for key in processed_missing if key in all_processed}
+            )
+
+        raw_ok, processed_ok, _ = await asyncio.gather(
+            self.redis.set_many(raw_entries, expire=RAW_TTL),
+            self.redis.set_many(
+                processed_entries,
+                expire=PROCESSED_HARD_TTL,
+                jitter=PROCESSED_TTL_JITTER
+            ),
+            self.redis.delete(*self._removed_keys(removed or set()))
+        )
+        ok = raw_ok and processed_ok
+        if not ok or len(failed) == len(self.endpoints):
+            status = "failed"
+        elif failed:
+            status = "partial"
+        else:
+            status = "completed"
+        # Com alguma coleção faltando, os fingerprints anteriores são mantidos
+        # para a próxima execução reescrever o que ficou de fora
+        if status == "completed":
+            await self.redis.set(FINGERPRINTS_KEY, fingerprints, expire=PROCESSED_HARD_TTL)
+        name_cache.set_many(graph.names())
+        finished = time.perf_counter()
+
+        for result in results:
+            result["cached_items"] = result["total_items"] if ok and result["status"] == "ok" else 0
+            print(
+                f"Warmed up {result['endpoint']}: {result['cached_items']}/{result['total_items']} items "
+                f"in {result['duration_seconds']}s"
+            )
+
         total_cached = sum(r['cached_items'] for r in results)
         total_items = sum(r['total_items'] for r in results)
-        
+
         return {
-            "status": "completed",
+            "status": status,
+            "mode": "incremental" if incremental else "full",
+            "failed_endpoints": sorted(failed),
             "total_endpoints": len(self.endpoints),
             "total_items": total_items,
             "total_cached": total_cached,
-            "details": results
-        }
\ No newline at end of file
+            "changed_items": len(changed - removed) if incremental else total_items,
+            "removed_items": len(removed) if incremental else 0,
+            "total_keys": len(raw_entries) + len(processed_entries),
+            "touched_keys": len(raw_touch) + len(processed_touch),
+            "rewritten_expired_keys": len(raw_missing) + len(processed_missing),
+            "requests_per_second": self.requests_per_second,
+            "fetch_seconds": round(fetched - started, 3),
+            "build_seconds": round(built - fetched, 3),
+            "write_seconds": round(finished - built, 3),
+            "duration_seconds": round(finished - started, 3),
+            "details": list(results)
+        }
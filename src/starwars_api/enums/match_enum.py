@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class Match(str, Enum):
+    EXACT = "exact"
+    IEXACT = "iexact"
+    CONTAINS = "contains"
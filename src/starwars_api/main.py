@@ -4,10 +4,11 @@ import os
 
 from fastapi import FastAPI
 
-from starwars_api.cache.cache import RedisCache
+from starwars_api.cache.cache_instance import redis_cache
 from starwars_api.routes.auth_router import router as auth_router
 from starwars_api.routes.auth_router import warm_cache
 from starwars_api.routes.swapi_router import router as swapi_router
+from starwars_api.util.http_client import http_client
 from fastapi.responses import JSONResponse
 from mangum import Mangum
 import sys
@@ -18,14 +19,17 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    redis = RedisCache()
     try:
-        await redis.connect()
+        await redis_cache.connect()
         print("Connected to Redis successfully")
     except Exception as e:
         print(f"Warning: Could not connect to Redis: {e}")
     yield
-    await redis.disconnect()
+    # No Lambda o Mangum executa o lifespan a cada invocação; os pools de
+    # Redis e HTTP são mantidos para o container aquecido reaproveitar.
+    if not os.getenv("AWS_LAMBDA_FUNCTION_NAME"):
+        await redis_cache.disconnect()
+        await http_client.close()
 
 
 app = FastAPI(
@@ -38,9 +42,8 @@ app = FastAPI(
 
 @app.get("/redis-test")
 async def redis_test():
-    redis = RedisCache()
     return {
-        "status": "connected" if await redis.ping() else "disconnected",
+        "status": "connected" if await redis_cache.ping() else "disconnected",
         "redis_url": os.getenv("REDIS_URL")
     }
     
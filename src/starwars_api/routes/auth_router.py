@@ -1,17 +1,32 @@
-from http.client import HTTPException
 import os
-from fastapi import APIRouter
-from starwars_api.cache.cache import RedisCache
-from starwars_api.cache.warmup_service import CacheWarmupService
-from starwars_api.services.auth_service import AuthService
-import httpx 
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from starwars_api.cache.cache_instance import redis_cache
+from starwars_api.cache.local_cache import name_cache
+from starwars_api.cache.snapshot import CacheSnapshot
+from starwars_api.cache.warmup_jobs import (
+    WarmupAlreadyRunning,
+    WarmupJobManager,
+    job_progress,
+)
+from starwars_api.services.auth_service import AuthService, require_admin
+from starwars_api.util.http_client import http_client
 
 router = APIRouter(
     prefix="",
     tags=["Authentication"],
 )
 
+# Rotas de snapshot ficam desligadas por padrão e, ligadas, exigem role admin
+SNAPSHOT_ROUTES_ENABLED = os.getenv("CACHE_SNAPSHOT_ROUTES", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SNAPSHOT_MAX_BYTES = int(os.getenv("CACHE_SNAPSHOT_MAX_BYTES", str(64 * 1024 * 1024)))
+
 auth_service = AuthService()
+warmup_jobs = WarmupJobManager(redis_cache)
+cache_snapshot = CacheSnapshot(redis_cache)
 
 
 @router.post("/auth", status_code=201, summary="Generate JWT Token")
@@ -19,54 +34,111 @@ async def authenticate():
     return await auth_service.generate_token()
 
 
-@router.post("/warm-cache", status_code=200, summary="Warm up cache")
-async def warm_cache():
-    redis = RedisCache()
+async def _require_redis():
+    # connect() levanta ConnectionError quando o Redis está fora
     try:
-        if not await redis.connect():
-            raise HTTPException(
-                status_code=503,
-                detail="Failed to connect to Redis"
-            )
-
-        warmup = CacheWarmupService(
-            redis_cache=redis,
-            request_delay=1.0,  
-            timeout=30.0
-        )
-        
-        result = await warmup.warm_all()
-        
-        return {
-            "status": "success",
-            "details": result,
-            "message": f"Cache warmed up successfully. {result['total_cached']} items cached."
-        }
-        
-    except HTTPException:
-        raise  
+        await redis_cache.connect()
     except Exception as e:
-        return {
-            "status": "error",
-            "message": "Failed to warm up cache",
-            "error": str(e)
-        }
-    finally:
-        try:
-            await redis.disconnect()
-        except Exception as e:
-            print(f"Error closing Redis connection: {e}")
+        print(f"Redis indisponível: {str(e)}")
+        raise HTTPException(status_code=503, detail="Failed to connect to Redis")
+
+
+@router.post("/warm-cache", status_code=202, summary="Start cache warm-up job")
+async def warm_cache(response: Response, incremental: bool = False):
+    await _require_redis()
+
+    try:
+        job = await warmup_jobs.start(incremental=incremental)
+    except WarmupAlreadyRunning as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Warm-up already running", "job_id": e.job_id},
+        )
+    except ConnectionError as e:
+        print(f"Redis indisponível: {str(e)}")
+        raise HTTPException(status_code=503, detail="Failed to connect to Redis")
+
+    if job["status"] != "running":
+        # Modo inline (Lambda): o job já terminou dentro desta requisição
+        response.status_code = 200
+        return {**job, "progress": job_progress(job)}
+
+    return {
+        "status": "accepted",
+        "job_id": job["job_id"],
+        "mode": job["mode"],
+        "status_url": f"/warm-cache/{job['job_id']}",
+    }
+
+
+@router.get("/warm-cache/{job_id}", status_code=200, summary="Cache warm-up job status")
+async def warm_cache_status(job_id: str):
+    job = await warmup_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Warm-up job not found")
+    return job
+
+def _snapshot_routes_enabled():
+    if not SNAPSHOT_ROUTES_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    length = request.headers.get("content-length")
+    if length and length.isdigit() and int(length) > limit:
+        raise HTTPException(status_code=413, detail="Snapshot too large")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail="Snapshot too large")
+    return bytes(body)
+
+
+@router.get(
+    "/cache-snapshot",
+    status_code=200,
+    summary="Export cache snapshot",
+    dependencies=[Depends(_snapshot_routes_enabled), Depends(require_admin)],
+)
+async def export_cache_snapshot():
+    await _require_redis()
+
+    data, report = await cache_snapshot.export()
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={
+            "Content-Disposition": 'attachment; filename="swapi-cache.snap"',
+            "X-Snapshot-Keys": str(report["keys"]),
+        },
+    )
+
+
+@router.post(
+    "/cache-snapshot",
+    status_code=200,
+    summary="Import cache snapshot",
+    dependencies=[Depends(_snapshot_routes_enabled), Depends(require_admin)],
+)
+async def import_cache_snapshot(request: Request):
+    await _require_redis()
+
+    try:
+        return await cache_snapshot.load(await _read_body(request, SNAPSHOT_MAX_BYTES))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 
 @router.get("/redis-health")
 async def redis_health():
-    redis = None
     try:
-        redis = RedisCache()
-        ping_result = await redis.ping()
+        ping_result = await redis_cache.ping()
         return {
             "status": "connected" if ping_result else "disconnected",
             "redis_url": os.getenv("REDIS_URL", "NOT_FOUND")[:50] + "...",
-            "ping_result": ping_result
+            "ping_result": ping_result,
+            "pool": redis_cache.pool_stats()
         }
     except Exception as e:
         return {
@@ -74,20 +146,25 @@ async def redis_health():
             "error": str(e),
             "redis_url": os.getenv("REDIS_URL", "NOT_FOUND")[:50] + "..."
         }
-    finally:
-        if redis:
-            await redis.disconnect()
             
+@router.get("/cache-stats", status_code=200, summary="Local cache statistics")
+async def cache_stats():
+    return {
+        "name_cache": name_cache.stats(),
+        "redis_pool": redis_cache.pool_stats(),
+    }
+
+
 @router.get("/swapi2", status_code=200, summary="SWAPI Health Check")
 async def swapi():
-    async with httpx.AsyncClient(timeout=10.0) as client:
-            response = await client.get("https://swapi.info/api")
-            response.raise_for_status()  # Levanta exceção se status não for 2xx
-            data = response.json()
-            
-            return {
-                "status": "connected",
-                "swapi_url": "https://swapi.info/api",
-                "response_status": response.status_code,
-                "available_endpoints": list(data.keys()) if isinstance(data, dict) else "unknown"
-            }
\ No newline at end of file
+    response = await http_client.get("https://swapi.info/api")
+    response.raise_for_status()  # Levanta exceção se status não for 2xx
+    data = response.json()
+
+    return {
+        "status": "connected",
+        "swapi_url": "https://swapi.info/api",
+        "response_status": response.status_code,
+        "http_version": response.http_version,
+        "available_endpoints": list(data.keys()) if isinstance(data, dict) else "unknown"
+    }
\ No newline at end of file
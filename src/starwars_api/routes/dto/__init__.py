@@ -1,4 +1,5 @@
 from .films_filter_dto import FilmsFilterDto
+from .page_params import PageParams
 from .people_filter_dto import PeopleFilterDto
 from .planets_filter_dto import PlanetsFilterDto
 from .species_filter_dto import SpeciesFilterDto
@@ -7,6 +8,7 @@ from .vehicles_filter_dto import VehiclesFilterDto
 
 __all__ = [
     "FilmsFilterDto",
+    "PageParams",
     "PeopleFilterDto",
     "PlanetsFilterDto",
     "SpeciesFilterDto",
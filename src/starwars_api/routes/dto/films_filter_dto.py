@@ -20,3 +20,7 @@ class FilmsFilterDto(BaseModel):
     vehicles: Optional[str] = None
     characters: Optional[str] = None
     planets: Optional[str] = None
+
+    # Faixas numéricas (inclusivas), comparadas com os valores já parseados
+    min_episode_id: Optional[float] = None
+    max_episode_id: Optional[float] = None
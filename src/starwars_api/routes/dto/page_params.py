@@ -0,0 +1,13 @@
+from typing import Optional
+
+from pydantic import BaseModel, Field
+
+
+class PageParams(BaseModel):
+    limit: Optional[int] = Field(None, ge=1)
+    offset: int = Field(0, ge=0)
+    # Cursor opaco devolvido em "next" na página anterior
+    cursor: Optional[str] = None
+
+    def options(self) -> dict:
+        return self.model_dump(exclude_defaults=True)
@@ -19,3 +19,9 @@ class PeopleFilterDto(BaseModel):
     species: Optional[str] = None
     starship: Optional[str] = None
     vehicle: Optional[str] = None
+
+    # Faixas numéricas (inclusivas), comparadas com os valores já parseados
+    min_height: Optional[float] = None
+    max_height: Optional[float] = None
+    min_mass: Optional[float] = None
+    max_mass: Optional[float] = None
@@ -20,3 +20,15 @@ class PlanetsFilterDto(BaseModel):
     #arrays
     residents: Optional[str] = None
     films:  Optional[str] = None
+
+    # Faixas numéricas (inclusivas), comparadas com os valores já parseados
+    min_rotation_period: Optional[float] = None
+    max_rotation_period: Optional[float] = None
+    min_orbital_period: Optional[float] = None
+    max_orbital_period: Optional[float] = None
+    min_diameter: Optional[float] = None
+    max_diameter: Optional[float] = None
+    min_surface_water: Optional[float] = None
+    max_surface_water: Optional[float] = None
+    min_population: Optional[float] = None
+    max_population: Optional[float] = None
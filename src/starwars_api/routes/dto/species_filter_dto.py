@@ -22,4 +22,9 @@ class SpeciesFilterDto(BaseModel):
     # arrays
     people: Optional[str] = None
     films: Optional[str] = None
-    
+
+    # Faixas numéricas (inclusivas), comparadas com os valores já parseados
+    min_average_height: Optional[float] = None
+    max_average_height: Optional[float] = None
+    min_average_lifespan: Optional[float] = None
+    max_average_lifespan: Optional[float] = None
@@ -21,4 +21,17 @@ class VehiclesFilterDto(BaseModel):
     #arrays
     films: Optional[str] = None
     pilots: Optional[str] = None
-    
+
+    # Faixas numéricas (inclusivas), comparadas com os valores já parseados
+    min_cost_in_credits: Optional[float] = None
+    max_cost_in_credits: Optional[float] = None
+    min_length: Optional[float] = None
+    max_length: Optional[float] = None
+    min_max_atmosphering_speed: Optional[float] = None
+    max_max_atmosphering_speed: Optional[float] = None
+    min_crew: Optional[float] = None
+    max_crew: Optional[float] = None
+    min_passengers: Optional[float] = None
+    max_passengers: Optional[float] = None
+    min_cargo_capacity: Optional[float] = None
+    max_cargo_capacity: Optional[float] = None
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
 
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import Response
+
+from starwars_api.cache.cache_instance import redis_cache
+from starwars_api.enums.match_enum import Match
+from starwars_api.enums.order_enum import Order
 from starwars_api.services.auth_service import get_current_user
 
 from ..services.swapi_service import SwapiService
 from .dto import (
     FilmsFilterDto,
+    PageParams,
     PeopleFilterDto,
     PlanetsFilterDto,
     SpeciesFilterDto,
@@ -15,64 +22,242 @@ from .dto import (
 router = APIRouter(
     prefix="/swapi", tags=["swapi"], dependencies=[Depends(get_current_user)]
 )
-swapi_service = SwapiService()
+swapi_service = SwapiService(redis_cache)
+
+
+def _json_response(body: bytes) -> Response:
+    # O corpo já vem serializado do cache; evita jsonable_encoder + json.dumps
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/{resource}/aggregate", status_code=200)
+async def aggregate(
+    resource: str,
+    group_by: Optional[str] = None,
+    sum_fields: Optional[str] = Query(None, alias="sum"),
+    avg: Optional[str] = None,
+    min_fields: Optional[str] = Query(None, alias="min"),
+    max_fields: Optional[str] = Query(None, alias="max"),
+    percentile: Optional[str] = None,
+    p: Optional[str] = None,
+):
+    # Registrada antes das rotas de detalhe para "aggregate" não virar um id
+    metrics = {
+        "sum": sum_fields,
+        "avg": avg,
+        "min": min_fields,
+        "max": max_fields,
+        "percentile": percentile,
+    }
+    return _json_response(
+        await swapi_service.aggregate(resource, group_by, metrics, p, raw=True)
+    )
 
 
 @router.get("/people", status_code=200)
-async def list_people(filters: PeopleFilterDto = Depends()):
-    return await swapi_service.list_people(filters)
+async def list_people(
+    filters: PeopleFilterDto = Depends(),
+    match: Match = Match.IEXACT,
+    sort_by: Optional[str] = None,
+    order: Order = Order.ASC,
+    page: PageParams = Depends(),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    return _json_response(
+        await swapi_service.list_people(
+            filters,
+            sort_by,
+            order,
+            raw=True,
+            match=match,
+            fields=fields,
+            expand=expand,
+            **page.options(),
+        )
+    )
 
 
 @router.get("/people/{person_id}", status_code=200)
-async def get_people(person_id: str):
-    return await swapi_service.get_people(person_id)
+async def get_people(
+    person_id: str, fields: Optional[str] = None, expand: Optional[str] = None
+):
+    return _json_response(
+        await swapi_service.get_people(person_id, raw=True, fields=fields, expand=expand)
+    )
 
 
 @router.get("/films", status_code=200)
-async def list_films(filters: FilmsFilterDto = Depends()):
-    return await swapi_service.list_films(filters)
+async def list_films(
+    filters: FilmsFilterDto = Depends(),
+    match: Match = Match.IEXACT,
+    sort_by: Optional[str] = None,
+    order: Order = Order.ASC,
+    page: PageParams = Depends(),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    return _json_response(
+        await swapi_service.list_films(
+            filters,
+            sort_by,
+            order,
+            raw=True,
+            match=match,
+            fields=fields,
+            expand=expand,
+            **page.options(),
+        )
+    )
 
 
 @router.get("/films/{film_id}", status_code=200)
-async def get_films(film_id: str):
-    return await swapi_service.get_films(film_id)
+async def get_films(
+    film_id: str, fields: Optional[str] = None, expand: Optional[str] = None
+):
+    return _json_response(
+        await swapi_service.get_films(film_id, raw=True, fields=fields, expand=expand)
+    )
 
 
 @router.get("/starships", status_code=200)
-async def list_starships(filters: StarshipsFilterDto = Depends()):
-    return await swapi_service.list_starships(filters)
+async def list_starships(
+    filters: StarshipsFilterDto = Depends(),
+    match: Match = Match.IEXACT,
+    sort_by: Optional[str] = None,
+    order: Order = Order.ASC,
+    page: PageParams = Depends(),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    return _json_response(
+        await swapi_service.list_starships(
+            filters,
+            sort_by,
+            order,
+            raw=True,
+            match=match,
+            fields=fields,
+            expand=expand,
+            **page.options(),
+        )
+    )
 
 
 @router.get("/starships/{starship_id}", status_code=200)
-async def get_starships(starship_id: str):
-    return await swapi_service.get_starships(starship_id)
+async def get_starships(
+    starship_id: str, fields: Optional[str] = None, expand: Optional[str] = None
+):
+    return _json_response(
+        await swapi_service.get_starships(starship_id, raw=True, fields=fields, expand=expand)
+    )
 
 
 @router.get("/vehicles", status_code=200)
-async def list_vehicles(filters: VehiclesFilterDto = Depends()):
-    return await swapi_service.list_vehicles(filters)
+async def list_vehicles(
+    filters: VehiclesFilterDto = Depends(),
+    match: Match = Match.IEXACT,
+    sort_by: Optional[str] = None,
+    order: Order = Order.ASC,
+    page: PageParams = Depends(),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    return _json_response(
+        await swapi_service.list_vehicles(
+            filters,
+            sort_by,
+            order,
+            raw=True,
+            match=match,
+            fields=fields,
+            expand=expand,
+            **page.options(),
+        )
+    )
 
 
 @router.get("/vehicles/{vehicle_id}", status_code=200)
-async def get_vehicles(vehicle_id: str):
-    return await swapi_service.get_vehicles(vehicle_id)
+async def get_vehicles(
+    vehicle_id: str, fields: Optional[str] = None, expand: Optional[str] = None
+):
+    return _json_response(
+        await swapi_service.get_vehicles(vehicle_id, raw=True, fields=fields, expand=expand)
+    )
 
 
 @router.get("/species", status_code=200)
-async def list_species(filters: SpeciesFilterDto = Depends()):
-    return await swapi_service.list_species(filters)
+async def list_species(
+    filters: SpeciesFilterDto = Depends(),
+    match: Match = Match.IEXACT,
+    sort_by: Optional[str] = None,
+    order: Order = Order.ASC,
+    page: PageParams = Depends(),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    return _json_response(
+        await swapi_service.list_species(
+            filters,
+            sort_by,
+            order,
+            raw=True,
+            match=match,
+            fields=fields,
+            expand=expand,
+            **page.options(),
+        )
+    )
 
 
 @router.get("/species/{species_id}", status_code=200)
-async def get_species(species_id: str):
-    return await swapi_service.get_species(species_id)
+async def get_species(
+    species_id: str, fields: Optional[str] = None, expand: Optional[str] = None
+):
+    return _json_response(
+        await swapi_service.get_species(species_id, raw=True, fields=fields, expand=expand)
+    )
 
 
 @router.get("/planets", status_code=200)
-async def list_planets(filters: PlanetsFilterDto = Depends()):
-    return await swapi_service.list_planets(filters)
+async def list_planets(
+    filters: PlanetsFilterDto = Depends(),
+    match: Match = Match.IEXACT,
+    sort_by: Optional[str] = None,
+    order: Order = Order.ASC,
+    page: PageParams = Depends(),
+    fields: Optional[str] = None,
+    expand: Optional[str] = None,
+):
+    return _json_response(
+        await swapi_service.list_planets(
+            filters,
+            sort_by,
+            order,
+            raw=True,
+            match=match,
+            fields=fields,
+            expand=expand,
+            **page.options(),
+        )
+    )
 
 
 @router.get("/planets/{planet_id}", status_code=200)
-async def get_planets(planet_id: str):
-    return await swapi_service.get_planets(planet_id)
+async def get_planets(
+    planet_id: str, fields: Optional[str] = None, expand: Optional[str] = None
+):
+    return _json_response(
+        await swapi_service.get_planets(planet_id, raw=True, fields=fields, expand=expand)
+    )
+
+
+@router.get("/{resource}/{resource_id}/related/{path:path}", status_code=200)
+async def list_related(
+    resource: str, resource_id: str, path: str, fields: Optional[str] = None
+):
+    return _json_response(
+        await swapi_service.list_related(
+            resource, resource_id, path, raw=True, fields=fields
+        )
+    )
@@ -52,3 +52,11 @@ async def get_current_user(
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+
+async def require_admin(user: dict = Depends(get_current_user)):
+    # Tokens emitidos por /auth têm role "user"; operações administrativas
+    # exigem um token com role "admin" assinado com a mesma chave
+    if user.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return user
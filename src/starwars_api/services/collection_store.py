@@ -0,0 +1,420 @@
+import asyncio
+import hashlib
+import heapq
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from starwars_api.cache.codec import dumps_json
+from starwars_api.cache.local_cache import name_cache
+from starwars_api.enums.match_enum import Match
+from starwars_api.util import resolve_name_fields_many
+from starwars_api.util.aggregation import aggregate_groups
+from starwars_api.util.entity_graph import EntityGraph, resource_endpoint
+from starwars_api.util.filtering import DataFilter, filter_field
+from starwars_api.util.indexing import build_indexes, index_names, intersect
+from starwars_api.util.numeric import build_columns, split_range_filters
+from starwars_api.util.projection import project, projected_relations
+from starwars_api.util.sorting import sort_key
+from starwars_api.util.single_flight import SingleFlight
+
+# Intervalo em que cada worker confere se a coleção no Redis mudou
+COLLECTION_REFRESH_INTERVAL = float(os.getenv("COLLECTION_REFRESH_INTERVAL", "60"))
+# Agregações memorizadas por versão da coleção (LRU)
+AGGREGATE_CACHE_SIZE = int(os.getenv("AGGREGATE_CACHE_SIZE", "64"))
+
+
+def collection_version(items: List[dict]) -> str:
+    return hashlib.blake2b(dumps_json(items), digest_size=16).hexdigest()
+
+
+def referenced_endpoints(items: List[dict], relation_fields: List[str]) -> Set[str]:
+    endpoints = set()
+    for item in items:
+        for field in relation_fields:
+            value = item.get(field)
+            for url in value if isinstance(value, list) else [value]:
+                if isinstance(url, str) and url.startswith("http"):
+                    endpoints.add(resource_endpoint(url))
+    return endpoints
+
+
+def entity_names(items: List[dict]) -> Dict[str, Optional[str]]:
+    return {item.get("url"): item.get("name") or item.get("title") for item in items}
+
+
+class Collection:
+    def __init__(
+        self,
+        endpoint: str,
+        items: List[dict],
+        relation_fields: List[str],
+        version: str,
+    ):
+        self.endpoint = endpoint
+        self.items = items
+        self.relation_fields = relation_fields
+        self.version = version
+        self.checked_at = time.monotonic()
+        # Linhas com nomes resolvidos, preenchidas sob demanda (só o que é servido)
+        self._resolved: List[Optional[dict]] = [None] * len(items)
+        # Linhas com alguma referência que voltou None (timeout, prazo, erro da
+        # SWAPI): servidas como estão, mas resolvidas de novo no próximo acesso
+        self._incomplete: Set[int] = set()
+        self._names_indexed = False
+        # Coleções cujos nomes aparecem nas linhas resolvidas e a versão de
+        # cada uma quando os nomes foram resolvidos
+        self.references = referenced_endpoints(items, relation_fields)
+        self.reference_versions: Dict[str, str] = {}
+        # Índices secundários por campo; uma nova versão da coleção cria outra
+        # instância, então os índices são reconstruídos junto
+        self.indexes = build_indexes(items, relation_fields)
+        # Colunas numéricas tipadas, parseadas uma única vez por versão
+        self.columns = build_columns(endpoint, items)
+        # Permutações e ranks por campo, montados sob demanda uma vez por versão
+        self._permutations: Dict[Tuple[str, bool], List[int]] = {}
+        self._ranks: Dict[str, List[int]] = {}
+        self._aggregates: "OrderedDict[tuple, List[dict]]" = OrderedDict()
+
+    def _unresolved(self, item: dict, row: dict) -> bool:
+        for field in self.relation_fields:
+            value = item.get(field)
+            if isinstance(value, list):
+                if None in (row.get(field) or []):
+                    return True
+            elif isinstance(value, str) and value.startswith("http"):
+                if row.get(field) is None:
+                    return True
+        return False
+
+    async def resolve(self, positions: Iterable[int]):
+        missing = [
+            position
+            for position in positions
+            if self._resolved[position] is None or position in self._incomplete
+        ]
+        if not missing:
+            return
+        retried = [position for position in missing if position in self._incomplete]
+        rows = await resolve_name_fields_many(
+            [dict(self.items[position]) for position in missing], self.relation_fields
+        )
+        for position, row in zip(missing, rows):
+            self._resolved[position] = row
+            if self._unresolved(self.items[position], row):
+                self._incomplete.add(position)
+            else:
+                self._incomplete.discard(position)
+
+        if retried:
+            # Nomes que faltavam entram nos índices e invalidam o que foi
+            # ordenado/agrupado pelos nomes antigos
+            if self._names_indexed:
+                index_names(self.indexes, self._resolved, retried)
+            self._forget_relations()
+
+    def _forget_relations(self):
+        relations = set(self.relation_fields)
+        for key in [key for key in self._permutations if key[0] in relations]:
+            del self._permutations[key]
+        for field in [field for field in self._ranks if field in relations]:
+            del self._ranks[field]
+        for key in [key for key in self._aggregates if key[0] in relations]:
+            del self._aggregates[key]
+
+    def forget_names(self):
+        # Alguma coleção referenciada mudou: nomes resolvidos e tudo que foi
+        # derivado deles são refeitos no próximo acesso
+        self._resolved = [None] * len(self.items)
+        self._incomplete.clear()
+        self._names_indexed = False
+        for index in self.indexes.values():
+            index.clear_names()
+        self._forget_relations()
+
+    async def resolve_all(self):
+        # Filtros/ordenação por nome de relacionamento precisam de todas as linhas
+        if self._names_indexed and not self._incomplete:
+            return
+        await self.resolve(range(len(self.items)))
+        if not self._names_indexed:
+            index_names(self.indexes, self._resolved)
+            self._names_indexed = True
+
+    async def rows(
+        self, positions: List[int], fields: Optional[Tuple[str, ...]] = None
+    ) -> List[dict]:
+        if not fields:
+            await self.resolve(positions)
+            return [self._resolved[position] for position in positions]
+
+        # Projeção: linhas já resolvidas são só recortadas; as demais resolvem
+        # apenas os relacionamentos pedidos
+        cached = [
+            None if position in self._incomplete else self._resolved[position]
+            for position in positions
+        ]
+        rows = [
+            project(row or self.items[position], fields)
+            for position, row in zip(positions, cached)
+        ]
+        pending = [row for row, cached_row in zip(rows, cached) if cached_row is None]
+        relations = projected_relations(self.relation_fields, fields)
+        if pending and relations:
+            await resolve_name_fields_many(pending, relations)
+        return rows
+
+    async def filter(self, filters: Dict[str, Any], match: Match = Match.IEXACT) -> List[int]:
+        ranges, filters = split_range_filters(filters, self.columns)
+        conditions = [(filter_field(name), value) for name, value in filters.items()]
+        if not conditions and not ranges:
+            return list(range(len(self.items)))
+        if any(field in self.relation_fields for field, _ in conditions):
+            await self.resolve_all()
+
+        postings = []
+        for field, (minimum, maximum) in ranges.items():
+            column = self.columns.get(field)
+            if column is None:
+                return []
+            postings.append(column.range(minimum, maximum))
+        for field, value in conditions:
+            index = self.indexes.get(field)
+            if index is None:
+                # Campo inexistente na coleção: nenhuma linha atende
+                return []
+            postings.append(index.candidates(value, match))
+        positions = sorted(intersect(postings))
+
+        if match == Match.EXACT:
+            # O índice é case-insensitive; confirma a comparação exata
+            positions = [
+                position
+                for position in positions
+                if all(
+                    DataFilter.matches(
+                        self.items[position],
+                        self._resolved[position] or self.items[position],
+                        field,
+                        value,
+                        self.relation_fields,
+                        match,
+                    )
+                    for field, value in conditions
+                )
+            ]
+        return positions
+
+    def _sort_keys(self, field: str) -> List[tuple]:
+        column = self.columns.get(field)
+        # Relacionamentos ordenam pelo nome resolvido, como o DataSorter
+        rows = self._resolved if field in self.relation_fields else self.items
+        return [
+            sort_key(row.get(field, ""), column.values[position] if column else None)
+            for position, row in enumerate(rows)
+        ]
+
+    async def _prepare_sort(self, sort_keys: List[Tuple[str, bool]]):
+        if any(field in self.relation_fields for field, _ in sort_keys):
+            await self.resolve_all()
+
+    def permutation(self, field: str, descending: bool = False) -> List[int]:
+        permutation = self._permutations.get((field, descending))
+        if permutation is None:
+            keys = self._sort_keys(field)
+            permutation = sorted(
+                range(len(self.items)), key=keys.__getitem__, reverse=descending
+            )
+            self._permutations[(field, descending)] = permutation
+        return permutation
+
+    def ranks(self, field: str) -> List[int]:
+        # Posição -> rank na ordem crescente (empates com o mesmo rank)
+        ranks = self._ranks.get(field)
+        if ranks is None:
+            keys = self._sort_keys(field)
+            ranks = [0] * len(self.items)
+            rank, previous = -1, None
+            for position in self.permutation(field):
+                if keys[position] != previous:
+                    rank, previous = rank + 1, keys[position]
+                ranks[position] = rank
+            self._ranks[field] = ranks
+        return ranks
+
+    async def sort(
+        self,
+        positions: List[int],
+        sort_keys: List[Tuple[str, bool]],
+        top: Optional[int] = None,
+    ) -> List[int]:
+        # top: só as primeiras N posições interessam (página atual)
+        if not sort_keys:
+            return positions if top is None else positions[:top]
+        await self._prepare_sort(sort_keys)
+
+        if len(sort_keys) == 1:
+            # Um campo: percorre a permutação pronta mantendo só as posições
+            # filtradas, parando assim que a página estiver completa
+            permutation = self.permutation(*sort_keys[0])
+            if len(positions) == len(self.items):
+                return list(permutation if top is None else permutation[:top])
+            selected = set(positions)
+            ordered = []
+            for position in permutation:
+                if position in selected:
+                    ordered.append(position)
+                    if top is not None and len(ordered) >= top:
+                        break
+            return ordered
+
+        # Vários campos: ordena por tuplas de ranks inteiros já calculados
+        ranks = [(self.ranks(field), descending) for field, descending in sort_keys]
+
+        def key(position: int) -> tuple:
+            return tuple(
+                -rank[position] if descending else rank[position]
+                for rank, descending in ranks
+            )
+
+        if top is not None and top < len(positions):
+            # Seleção parcial (top-k) em vez de ordenar tudo
+            return heapq.nsmallest(top, positions, key=key)
+        return sorted(positions, key=key)
+
+    async def aggregate(
+        self,
+        group_by: Optional[str],
+        metrics: Dict[str, List[str]],
+        percentiles: Tuple[float, ...],
+    ) -> List[dict]:
+        # Ordem e repetição dos campos não mudam o resultado: normaliza antes
+        # de calcular e de montar a chave
+        metrics = {
+            function: sorted(set(fields)) for function, fields in metrics.items() if fields
+        }
+        # Resultado guardado na própria instância, ou seja, por versão da coleção
+        key = (
+            group_by,
+            tuple((name, tuple(fields)) for name, fields in sorted(metrics.items())),
+            percentiles,
+        )
+        cached = self._aggregates.get(key)
+        if cached is not None:
+            self._aggregates.move_to_end(key)
+            return cached
+
+        fields = list(dict.fromkeys(field for names in metrics.values() for field in names))
+        unknown = [field for field in fields if field not in self.columns]
+        if unknown:
+            raise ValueError(f"Campos não numéricos: {', '.join(unknown)}")
+        if group_by and self.items and all(group_by not in item for item in self.items):
+            raise ValueError(f"Campo de agrupamento inexistente: {group_by}")
+
+        positions = list(range(len(self.items)))
+        keys: List[Any] = [None] * len(positions)
+        if group_by:
+            if group_by in self.relation_fields:
+                await self.resolve_all()
+            rows = self._resolved if group_by in self.relation_fields else self.items
+            # Campos em lista (ex.: species) contam a linha em cada grupo
+            positions, keys = [], []
+            for position, row in enumerate(rows):
+                value = row.get(group_by)
+                for group in (value or [None]) if isinstance(value, list) else [value]:
+                    positions.append(position)
+                    keys.append(group)
+
+        columns = {
+            field: [self.columns[field].values[position] for position in positions]
+            for field in fields
+        }
+        cached = aggregate_groups(
+            keys, columns, metrics, percentiles, label=group_by or "group"
+        )
+        if not group_by:
+            for row in cached:
+                del row["group"]
+        self._aggregates[key] = cached
+        while len(self._aggregates) > AGGREGATE_CACHE_SIZE:
+            self._aggregates.popitem(last=False)
+        return cached
+
+
+class CollectionStore:
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[List[dict]]],
+        fields_map: Dict[str, List[str]],
+        refresh_interval: Optional[float] = None,
+    ):
+        self.loader = loader
+        self.fields_map = fields_map
+        self.refresh_interval = (
+            COLLECTION_REFRESH_INTERVAL if refresh_interval is None else refresh_interval
+        )
+        self._collections: Dict[str, Collection] = {}
+        self._flights = SingleFlight()
+        self._graph: Optional[EntityGraph] = None
+        self._graph_version: Optional[Tuple[str, ...]] = None
+
+    async def get(self, endpoint: str) -> Collection:
+        current = self._collections.get(endpoint)
+        if current and time.monotonic() - current.checked_at < self.refresh_interval:
+            return current
+        return await self._flights.do(endpoint, lambda: self._refresh(endpoint))
+
+    async def _refresh(self, endpoint: str) -> Collection:
+        collection = await self._load(endpoint)
+        # Linhas resolvidas trazem nomes de outras coleções (ex.: homeworld);
+        # se alguma delas mudou desde a resolução, os nomes são descartados
+        references = await asyncio.gather(
+            *[self._reference(reference) for reference in sorted(collection.references)]
+        )
+        versions = {reference.endpoint: reference.version for reference in references}
+        if collection.reference_versions and versions != collection.reference_versions:
+            collection.forget_names()
+        collection.reference_versions = versions
+        return collection
+
+    async def _reference(self, endpoint: str) -> Collection:
+        # Sem conferir as referências da própria referência (evita ciclos)
+        current = self._collections.get(endpoint)
+        if current and time.monotonic() - current.checked_at < self.refresh_interval:
+            return current
+        return await self._flights.do(f"load:{endpoint}", lambda: self._load(endpoint))
+
+    async def _load(self, endpoint: str) -> Collection:
+        items = await self.loader(endpoint)
+        version = collection_version(items)
+
+        current = self._collections.get(endpoint)
+        if current and current.version == version:
+            # Nada mudou no Redis: mantém a coleção (e o que foi derivado dela)
+            current.checked_at = time.monotonic()
+            return current
+
+        if current:
+            # Nomes alterados saem do cache local do url_to_name deste worker
+            previous, names = entity_names(current.items), entity_names(items)
+            name_cache.delete_many(
+                url for url, name in previous.items() if url and names.get(url) != name
+            )
+
+        collection = Collection(endpoint, items, self.fields_map.get(endpoint, []), version)
+        self._collections[endpoint] = collection
+        return collection
+
+    async def graph(self) -> EntityGraph:
+        # Grafo URL -> entidade das seis coleções, refeito quando alguma muda
+        collections = await asyncio.gather(*[self.get(endpoint) for endpoint in self.fields_map])
+        version = tuple(collection.version for collection in collections)
+        if self._graph is None or self._graph_version != version:
+            # Grafo e índice de adjacência são trocados juntos numa única
+            # atribuição; quem já tem a referência antiga segue com ela
+            self._graph = EntityGraph(
+                {collection.endpoint: collection.items for collection in collections}
+            )
+            self._graph_version = version
+        return self._graph
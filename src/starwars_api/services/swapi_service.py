@@ -1,11 +1,22 @@
+import asyncio
 import json
-from typing import Optional
+import os
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple
 
 import httpx
 from fastapi import HTTPException
 from pydantic import BaseModel
 
 from starwars_api.cache.cache import RedisCache
+from starwars_api.cache.cache_instance import redis_cache
+from starwars_api.cache.codec import dumps_json, loads_json
+from starwars_api.cache.ttl import (
+    PROCESSED_HARD_TTL,
+    PROCESSED_SOFT_TTL,
+    PROCESSED_TTL_JITTER,
+    RAW_TTL,
+)
+from starwars_api.enums.match_enum import Match
 from starwars_api.enums.order_enum import Order
 from starwars_api.routes.dto import (
     FilmsFilterDto,
@@ -15,7 +26,24 @@ from starwars_api.routes.dto import (
     StarshipsFilterDto,
     VehiclesFilterDto,
 )
-from starwars_api.util import DataSorter, resolve_name_fields
+from starwars_api.util import (
+    DataSorter,
+    resolve_name_fields,
+    resolve_name_fields_many,
+)
+from starwars_api.services.collection_store import CollectionStore
+from starwars_api.util.aggregation import AGGREGATIONS, parse_percentiles
+from starwars_api.util.entity_graph import expand_key, parse_expand
+from starwars_api.util.http_client import http_client
+from starwars_api.util.pagination import encode_cursor, page_window, query_fingerprint
+from starwars_api.util.projection import (
+    parse_fields,
+    project,
+    projected_relations,
+    projection_key,
+)
+from starwars_api.util.single_flight import SingleFlight
+from starwars_api.util.sorting import parse_sort_keys
 
 # Mapeamento de campos para resolução de nomes por endpoint
 ENDPOINT_FIELDS_MAP = {
@@ -27,14 +55,48 @@ ENDPOINT_FIELDS_MAP = {
     "planets": ["residents", "films"],
 }
 
+# Campos aceitos em fields=: relacionamentos, campos dos DTOs de filtro e os
+# presentes em todo recurso. Nomes fora disso não viram chave de cache
+ENDPOINT_FILTER_DTOS = {
+    "people": PeopleFilterDto,
+    "films": FilmsFilterDto,
+    "starships": StarshipsFilterDto,
+    "vehicles": VehiclesFilterDto,
+    "species": SpeciesFilterDto,
+    "planets": PlanetsFilterDto,
+}
+COMMON_FIELDS = ("url", "created", "edited")
+
+
+def known_fields(endpoint: str) -> Set[str]:
+    return {
+        *COMMON_FIELDS,
+        *ENDPOINT_FIELDS_MAP[endpoint],
+        *ENDPOINT_FILTER_DTOS[endpoint].model_fields,
+    }
+
+
+# Proteção contra stampede: só um worker reconstrói uma chave por vez e os
+# demais esperam até REBUILD_LOCK_WAIT segundos pelo resultado dele
+REBUILD_LOCK_TTL = 60
+REBUILD_LOCK_WAIT = float(os.getenv("CACHE_REBUILD_LOCK_WAIT", "5.0"))
+REFRESH_LOCK_TTL = 60
+
 
 class SwapiService:
-    def __init__(self):
+    def __init__(self, cache: Optional[RedisCache] = None):
         self.api_url = "https://swapi.info/api/"
-        self.redis = RedisCache()
+        self._redis = cache
+        self._refresh_tasks = {}
+        self._flights = SingleFlight()
+        # Coleções completas em memória: filtros são respondidos localmente
+        self.collections = CollectionStore(self._load_collection, ENDPOINT_FIELDS_MAP)
 
+    @property
+    def redis(self) -> RedisCache:
+        # Sem injeção explícita, usa o pool compartilhado da aplicação
+        return self._redis or redis_cache
 
-    
     async def _get_cache_key(
         self,
         endpoint: str,
@@ -55,47 +117,193 @@ class SwapiService:
         endpoint: str,
         resource_id: Optional[str] = None,
         filters: Optional[BaseModel] = None,
+        refresh: bool = False,
     ):
         cache_key = await self._get_cache_key(endpoint, resource_id, filters)
 
-        cached_data = await self.redis.get(cache_key)
-        if cached_data:
-            return cached_data
-
-        api_params = filters.model_dump(exclude_none=True) if filters else {}
-        url = f"{self.api_url}{endpoint}"
-        if resource_id:
-            url = f"{url}/{resource_id}"
-
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=api_params)
+        if not refresh:
+            cached_data = await self.redis.get(cache_key)
+            if cached_data:
+                return cached_data
+
+        async with self.redis.lock(
+            cache_key, expire=REBUILD_LOCK_TTL, wait=REBUILD_LOCK_WAIT
+        ) as lock:
+            if lock.waited and not refresh:
+                # Outro worker buscou enquanto esperávamos pelo lock
+                cached_data = await self.redis.get(cache_key)
+                if cached_data:
+                    return cached_data
+
+            api_params = filters.model_dump(exclude_none=True) if filters else {}
+            url = f"{self.api_url}{endpoint}"
+            if resource_id:
+                url = f"{url}/{resource_id}"
+
+            response = await http_client.get(url, params=api_params)
             response.raise_for_status()
             data = response.json()
 
-            await self.redis.set(cache_key, data, expire=3600)
+            await self.redis.set(cache_key, data, expire=RAW_TTL)
             return data
 
+    async def _load_collection(self, endpoint: str):
+        return await self._make_request(endpoint)
+
     async def _process_response(
         self,
         data,
         endpoint: str,
         sort_by: Optional[str] = None,
         order: Order = Order.ASC,
+        fields: Optional[Tuple[str, ...]] = None,
     ):
+        relations = projected_relations(ENDPOINT_FIELDS_MAP[endpoint], fields)
         if isinstance(data, list):
             if sort_by:
                 data = DataSorter.sort(data, sort_by, order)
+            if fields:
+                data = [project(item, fields) for item in data]
 
-            formatted_results = []
-            for item in data:
-                formatted_item = await resolve_name_fields(
-                    item, ENDPOINT_FIELDS_MAP[endpoint]
+            return await resolve_name_fields_many(data, relations)
+        else:
+            return await resolve_name_fields(project(data, fields), relations)
+
+    @staticmethod
+    def _as_result(value, raw: bool = False):
+        # raw=True devolve o corpo JSON pronto; caso contrário, objetos Python
+        if raw:
+            return value if isinstance(value, bytes) else dumps_json(value)
+        return loads_json(value) if isinstance(value, bytes) else value
+
+    async def _refresh(self, key: str, compute: Callable[[], Awaitable]):
+        # Apenas um worker (entre todos os processos) reconstrói a chave
+        async with self.redis.lock(f"refresh:{key}", expire=REFRESH_LOCK_TTL) as lock:
+            if not lock.acquired:
+                return
+            try:
+                result = await compute()
+                await self.redis.set(
+                    key,
+                    dumps_json(result),
+                    expire=PROCESSED_HARD_TTL,
+                    jitter=PROCESSED_TTL_JITTER,
                 )
-                formatted_results.append(formatted_item)
+            except Exception as e:
+                print(f"Erro ao atualizar {key} em background: {str(e)}")
 
-            return formatted_results
-        else:
-            return await resolve_name_fields(data, ENDPOINT_FIELDS_MAP[endpoint])
+    def _schedule_refresh(self, key: str, compute: Callable[[], Awaitable]):
+        if key in self._refresh_tasks:
+            return
+        task = asyncio.create_task(self._refresh(key, compute))
+        self._refresh_tasks[key] = task
+        task.add_done_callback(lambda _: self._refresh_tasks.pop(key, None))
+
+    async def _get_processed(
+        self,
+        key: str,
+        compute: Callable[..., Awaitable],
+    ):
+        cached, ttl = await self.redis.get_with_ttl(key)
+        if cached:
+            age = PROCESSED_HARD_TTL - ttl
+            if ttl >= 0 and age > PROCESSED_SOFT_TTL:
+                # Stale-while-revalidate: responde já e atualiza em background
+                self._schedule_refresh(key, lambda: compute(refresh=True))
+            return cached
+
+        async with self.redis.lock(
+            key, expire=REBUILD_LOCK_TTL, wait=REBUILD_LOCK_WAIT
+        ) as lock:
+            if lock.waited:
+                # Quem segurava o lock provavelmente já gravou o resultado
+                cached, _ = await self.redis.get_with_ttl(key)
+                if cached:
+                    return cached
+
+            result = await compute()
+
+            # O corpo final é cacheado já serializado para ser servido sem parse
+            body = dumps_json(result)
+            await self.redis.set(
+                key, body, expire=PROCESSED_HARD_TTL, jitter=PROCESSED_TTL_JITTER
+            )
+            return body
+
+    @staticmethod
+    def _parse_fields(endpoint: str, fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+        projection = parse_fields(fields)
+        unknown = [field for field in projection or () if field not in known_fields(endpoint)]
+        if unknown:
+            raise HTTPException(
+                status_code=400, detail=f"Campos desconhecidos: {', '.join(unknown)}"
+            )
+        return projection
+
+    @staticmethod
+    def _parse_expand(expand: Optional[str]) -> dict:
+        try:
+            return parse_expand(expand)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def _query_collection(
+        self,
+        endpoint: str,
+        filter_dict: dict,
+        sort_by: Optional[str],
+        order: Order,
+        match: Match,
+        limit: Optional[int],
+        offset: int,
+        cursor: Optional[str],
+        projection: Optional[Tuple[str, ...]] = None,
+        tree: Optional[dict] = None,
+    ):
+        # Filtros, ordenação e paginação rodam sobre a coleção completa em
+        # memória, sem ir à SWAPI nem ordenar do zero a cada combinação
+        query = query_fingerprint(
+            endpoint, filter_dict, sort_by, order, match, projection, tree
+        )
+        try:
+            offset, limit = page_window(offset, limit, cursor, query)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        collection = await self.collections.get(endpoint)
+        positions = await collection.filter(filter_dict, match)
+        sort_keys = parse_sort_keys(sort_by, order)
+
+        async def rows(page):
+            if not tree:
+                return await collection.rows(page, projection)
+            graph = await self.collections.graph()
+            # Projeção antes da expansão: relacionamentos descartados pelo
+            # fields= nem chegam a ser expandidos ou resolvidos
+            return [
+                graph.expand(
+                    project(collection.items[position], projection),
+                    tree,
+                    ENDPOINT_FIELDS_MAP,
+                    endpoint,
+                )
+                for position in page
+            ]
+
+        if limit is None and not cursor:
+            positions = await collection.sort(positions, sort_keys)
+            return await rows(positions[offset:])
+
+        # Só as linhas da página são ordenadas por completo e têm nomes resolvidos
+        total = len(positions)
+        ordered = await collection.sort(positions, sort_keys, top=offset + limit)
+        page = ordered[offset:offset + limit]
+        next_offset = offset + limit
+        return {
+            "count": total,
+            "next": encode_cursor(next_offset, limit, query) if next_offset < total else None,
+            "results": await rows(page),
+        }
 
     async def list_resources(
         self,
@@ -103,106 +311,217 @@ class SwapiService:
         filters: Optional[BaseModel] = None,
         sort_by: Optional[str] = None,
         order: Order = Order.ASC,
+        raw: bool = False,
+        match: Match = Match.IEXACT,
+        limit: Optional[int] = None,
+        offset: int = 0,
+        cursor: Optional[str] = None,
+        fields: Optional[str] = None,
+        expand: Optional[str] = None,
     ):
         try:
-            processed_cache_key = await self._get_cache_key(
-                f"{endpoint}_processed", None, filters
-            )
-            if sort_by:
-                processed_cache_key += f":sort:{sort_by}:{order.value}"
-
-            cached_processed = await self.redis.get(processed_cache_key)
-            if cached_processed:
-                return cached_processed
+            projection = self._parse_fields(endpoint, fields)
+            tree = self._parse_expand(expand)
+            filter_dict = filters.model_dump(exclude_none=True) if filters else {}
+            if filter_dict or sort_by or limit or offset or cursor or tree:
+                result = await self._query_collection(
+                    endpoint,
+                    filter_dict,
+                    sort_by,
+                    order,
+                    match,
+                    limit,
+                    offset,
+                    cursor,
+                    projection,
+                    tree,
+                )
+                return self._as_result(dumps_json(result), raw)
 
-            data = await self._make_request(endpoint, None, filters)
-            result = await self._process_response(data, endpoint, sort_by, order)
+            processed_cache_key = f"{endpoint}_processed{projection_key(projection)}"
 
-            await self.redis.set(processed_cache_key, result, expire=1800)
+            async def compute(refresh: bool = False):
+                data = await self._make_request(endpoint, None, None, refresh)
+                return await self._process_response(data, endpoint, fields=projection)
 
-            return result
+            value = await self._flights.do(
+                processed_cache_key,
+                lambda: self._get_processed(processed_cache_key, compute),
+            )
+            return self._as_result(value, raw)
         except httpx.HTTPStatusError as e:
             raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
-    async def get_resource(self, endpoint: str, resource_id: str):
+    async def get_resource(
+        self,
+        endpoint: str,
+        resource_id: str,
+        raw: bool = False,
+        fields: Optional[str] = None,
+        expand: Optional[str] = None,
+    ):
         try:
-            processed_cache_key = f"{endpoint}_{resource_id}_processed"
+            projection = self._parse_fields(endpoint, fields)
+            tree = self._parse_expand(expand)
+            processed_cache_key = (
+                f"{endpoint}_{resource_id}_processed{projection_key(projection)}"
+            )
+            if tree:
+                processed_cache_key += f":expand:{expand_key(tree)}"
+
+            async def compute(refresh: bool = False):
+                if tree:
+                    # Expansão vem inteira do grafo, sem url_to_name por referência
+                    graph = await self.collections.graph()
+                    url = graph.url_for(endpoint, resource_id)
+                    data = graph.get(url) if url else None
+                    if data is None:
+                        data = await self._make_request(endpoint, resource_id, None, refresh)
+                    return graph.expand(
+                        project(data, projection), tree, ENDPOINT_FIELDS_MAP, endpoint
+                    )
+
+                data = await self._make_request(endpoint, resource_id, None, refresh)
+                return await self._process_response(data, endpoint, fields=projection)
+
+            value = await self._flights.do(
+                processed_cache_key,
+                lambda: self._get_processed(processed_cache_key, compute),
+            )
+            return self._as_result(value, raw)
+        except httpx.HTTPStatusError as e:
+            raise HTTPException(status_code=e.response.status_code, detail=str(e))
 
-            cached_processed = await self.redis.get(processed_cache_key)
-            if cached_processed:
-                return cached_processed
+    async def list_related(
+        self,
+        endpoint: str,
+        resource_id: str,
+        path: str,
+        raw: bool = False,
+        fields: Optional[str] = None,
+    ):
+        # Relacionamentos (inclusive reversos) lidos do índice de adjacência
+        hops = [hop for hop in path.strip("/").split("/") if hop]
+        unknown = [hop for hop in [endpoint, *hops] if hop not in ENDPOINT_FIELDS_MAP]
+        if not hops or unknown:
+            raise HTTPException(
+                status_code=404, detail=f"Recurso desconhecido: {', '.join(unknown) or path}"
+            )
 
-            data = await self._make_request(endpoint, resource_id)
-            result = await self._process_response(data, endpoint)
+        projection = self._parse_fields(hops[-1], fields)
+        try:
+            graph = await self.collections.graph()
+        except httpx.HTTPStatusError as e:
+            raise HTTPException(status_code=e.response.status_code, detail=str(e))
+        url = graph.url_for(endpoint, resource_id)
+        if url is None:
+            raise HTTPException(
+                status_code=404, detail=f"{endpoint}/{resource_id} não encontrado"
+            )
 
-            await self.redis.set(processed_cache_key, result, expire=1800)
+        target = hops[-1]
+        result = [
+            project(graph.resolve(graph.get(ref), ENDPOINT_FIELDS_MAP[target]), projection)
+            for ref in graph.related(url, hops)
+        ]
+        return self._as_result(dumps_json(result), raw)
 
-            return result
+    async def aggregate(
+        self,
+        endpoint: str,
+        group_by: Optional[str] = None,
+        metrics: Optional[Dict[str, Optional[str]]] = None,
+        percentiles: Optional[str] = None,
+        raw: bool = False,
+    ):
+        # Estatísticas calculadas sobre as colunas tipadas da coleção em memória
+        if endpoint not in ENDPOINT_FIELDS_MAP:
+            raise HTTPException(status_code=404, detail=f"Recurso desconhecido: {endpoint}")
+
+        requested = {
+            function: [field.strip() for field in fields.split(",") if field.strip()]
+            for function, fields in (metrics or {}).items()
+            if fields and function in AGGREGATIONS
+        }
+        try:
+            collection = await self.collections.get(endpoint)
+            result = await collection.aggregate(
+                group_by or None, requested, parse_percentiles(percentiles)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except httpx.HTTPStatusError as e:
             raise HTTPException(status_code=e.response.status_code, detail=str(e))
+        return self._as_result(dumps_json(result), raw)
 
     async def list_people(
         self,
         filters: Optional[PeopleFilterDto] = None,
         sort_by: Optional[str] = None,
         order: Order = Order.ASC,
+        **options,
     ):
-        return await self.list_resources("people", filters, sort_by, order)
+        return await self.list_resources("people", filters, sort_by, order, **options)
 
-    async def get_people(self, person_id: str):
-        return await self.get_resource("people", person_id)
+    async def get_people(self, person_id: str, **options):
+        return await self.get_resource("people", person_id, **options)
 
     async def list_films(
         self,
         filters: Optional[FilmsFilterDto] = None,
         sort_by: Optional[str] = None,
         order: Order = Order.ASC,
+        **options,
     ):
-        return await self.list_resources("films", filters, sort_by, order)
+        return await self.list_resources("films", filters, sort_by, order, **options)
 
-    async def get_films(self, film_id: str):
-        return await self.get_resource("films", film_id)
+    async def get_films(self, film_id: str, **options):
+        return await self.get_resource("films", film_id, **options)
 
     async def list_starships(
         self,
         filters: Optional[StarshipsFilterDto] = None,
         sort_by: Optional[str] = None,
         order: Order = Order.ASC,
+        **options,
     ):
-        return await self.list_resources("starships", filters, sort_by, order)
+        return await self.list_resources("starships", filters, sort_by, order, **options)
 
-    async def get_starships(self, starship_id: str):
-        return await self.get_resource("starships", starship_id)
+    async def get_starships(self, starship_id: str, **options):
+        return await self.get_resource("starships", starship_id, **options)
 
     async def list_vehicles(
         self,
         filters: Optional[VehiclesFilterDto] = None,
         sort_by: Optional[str] = None,
         order: Order = Order.ASC,
+        **options,
     ):
-        return await self.list_resources("vehicles", filters, sort_by, order)
+        return await self.list_resources("vehicles", filters, sort_by, order, **options)
 
-    async def get_vehicles(self, vehicle_id: str):
-        return await self.get_resource("vehicles", vehicle_id)
+    async def get_vehicles(self, vehicle_id: str, **options):
+        return await self.get_resource("vehicles", vehicle_id, **options)
 
     async def list_species(
         self,
         filters: Optional[SpeciesFilterDto] = None,
         sort_by: Optional[str] = None,
         order: Order = Order.ASC,
+        **options,
     ):
-        return await self.list_resources("species", filters, sort_by, order)
+        return await self.list_resources("species", filters, sort_by, order, **options)
 
-    async def get_species(self, species_id: str):
-        return await self.get_resource("species", species_id)
+    async def get_species(self, species_id: str, **options):
+        return await self.get_resource("species", species_id, **options)
 
     async def list_planets(
         self,
         filters: Optional[PlanetsFilterDto] = None,
         sort_by: Optional[str] = None,
         order: Order = Order.ASC,
+        **options,
     ):
-        return await self.list_resources("planets", filters, sort_by, order)
+        return await self.list_resources("planets", filters, sort_by, order, **options)
 
-    async def get_planets(self, planet_id: str):
-        return await self.get_resource("planets", planet_id)
+    async def get_planets(self, planet_id: str, **options):
+        return await self.get_resource("planets", planet_id, **options)
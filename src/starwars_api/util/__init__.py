@@ -1,4 +1,4 @@
 from .sorting import DataSorter
-from .resolve_name_fields import resolve_name_fields
+from .resolve_name_fields import resolve_name_fields, resolve_name_fields_many
 
-__all__ = ["DataSorter", "resolve_name_fields"]
\ No newline at end of file
+__all__ = ["DataSorter", "resolve_name_fields", "resolve_name_fields_many"]
@@ -0,0 +1,156 @@
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - fallback puro se o numpy faltar
+    np = None
+
+AGGREGATIONS = ("sum", "avg", "min", "max", "percentile")
+
+
+def parse_percentiles(percentiles: Optional[str]) -> Tuple[float, ...]:
+    # "50,90" -> (50.0, 90.0); sem valor, mediana
+    values = []
+    for part in (percentiles or "50").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            value = float(part)
+        except ValueError:
+            raise ValueError(f"Percentil inválido: {part}")
+        if not 0 <= value <= 100:
+            raise ValueError(f"Percentil fora de 0-100: {part}")
+        values.append(value)
+    return tuple(sorted(set(values))) or (50.0,)
+
+
+def metric_name(function: str, field: str, percentile: Optional[float] = None) -> str:
+    if function == "percentile":
+        return f"p{percentile:g}_{field}"
+    return f"{function}_{field}"
+
+
+def group_codes(keys: Sequence[Any]) -> Tuple[List[Any], List[int]]:
+    # Rótulos em ordem estável e o código do grupo de cada linha
+    labels = sorted(set(keys), key=lambda label: (label is None, str(label).lower()))
+    codes_by_label = {label: code for code, label in enumerate(labels)}
+    return labels, [codes_by_label[key] for key in keys]
+
+
+def _percentile(values: List[float], percentile: float) -> float:
+    # Interpolação linear, mesmo método padrão do numpy.percentile
+    rank = (len(values) - 1) * percentile / 100
+    lower = math.floor(rank)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (rank - lower)
+
+
+def _aggregate_python(
+    groups: int,
+    codes: List[int],
+    columns: Dict[str, List[Optional[float]]],
+    metrics: Dict[str, List[str]],
+    percentiles: Tuple[float, ...],
+) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = [{} for _ in range(groups)]
+    for field, values in columns.items():
+        grouped: List[List[float]] = [[] for _ in range(groups)]
+        for code, value in zip(codes, values):
+            if value is not None:
+                grouped[code].append(value)
+        for result, known in zip(results, grouped):
+            known.sort()
+            for function in AGGREGATIONS:
+                if field not in metrics.get(function, []):
+                    continue
+                if function == "sum":
+                    result[metric_name(function, field)] = math.fsum(known) if known else None
+                elif function == "avg":
+                    result[metric_name(function, field)] = (
+                        math.fsum(known) / len(known) if known else None
+                    )
+                elif function == "min":
+                    result[metric_name(function, field)] = known[0] if known else None
+                elif function == "max":
+                    result[metric_name(function, field)] = known[-1] if known else None
+                else:
+                    for percentile in percentiles:
+                        result[metric_name(function, field, percentile)] = (
+                            _percentile(known, percentile) if known else None
+                        )
+    return results
+
+
+def _aggregate_numpy(
+    groups: int,
+    codes: List[int],
+    columns: Dict[str, List[Optional[float]]],
+    metrics: Dict[str, List[str]],
+    percentiles: Tuple[float, ...],
+) -> List[Dict[str, Any]]:
+    results: List[Dict[str, Any]] = [{} for _ in range(groups)]
+    codes_array = np.asarray(codes, dtype=np.intp)
+    for field, values in columns.items():
+        array = np.array([np.nan if value is None else value for value in values], dtype=float)
+        known = ~np.isnan(array)
+        known_codes, known_values = codes_array[known], array[known]
+        counts = np.bincount(known_codes, minlength=groups)
+        sums = np.bincount(known_codes, weights=known_values, minlength=groups)
+
+        computed: Dict[str, Any] = {}
+        if field in metrics.get("sum", []):
+            computed[metric_name("sum", field)] = sums
+        if field in metrics.get("avg", []):
+            with np.errstate(invalid="ignore", divide="ignore"):
+                computed[metric_name("avg", field)] = sums / counts
+        if field in metrics.get("min", []):
+            minimums = np.full(groups, np.inf)
+            np.minimum.at(minimums, known_codes, known_values)
+            computed[metric_name("min", field)] = minimums
+        if field in metrics.get("max", []):
+            maximums = np.full(groups, -np.inf)
+            np.maximum.at(maximums, known_codes, known_values)
+            computed[metric_name("max", field)] = maximums
+        if field in metrics.get("percentile", []):
+            # Ordena por (grupo, valor) uma vez e fatia cada grupo
+            ordered = known_values[np.lexsort((known_values, known_codes))]
+            ends = np.cumsum(counts)
+            for percentile in percentiles:
+                column = np.full(groups, np.nan)
+                for code in np.flatnonzero(counts):
+                    column[code] = np.percentile(
+                        ordered[ends[code] - counts[code]:ends[code]], percentile
+                    )
+                computed[metric_name("percentile", field, percentile)] = column
+
+        for name, column in computed.items():
+            for code, result in enumerate(results):
+                # Grupo sem valores conhecidos: None, como no caminho puro
+                if counts[code] == 0:
+                    result[name] = None
+                else:
+                    result[name] = float(column[code])
+    return results
+
+
+def aggregate_groups(
+    keys: Sequence[Any],
+    columns: Dict[str, List[Optional[float]]],
+    metrics: Dict[str, List[str]],
+    percentiles: Tuple[float, ...] = (50.0,),
+    label: str = "group",
+) -> List[Dict[str, Any]]:
+    # keys[i] é o grupo da linha i; columns traz os valores tipados dessas linhas
+    labels, codes = group_codes(keys)
+    counts = [0] * len(labels)
+    for code in codes:
+        counts[code] += 1
+
+    compute = _aggregate_numpy if np is not None else _aggregate_python
+    metrics_by_group = compute(len(labels), codes, columns, metrics, percentiles)
+    return [
+        {label: group, "count": count, **group_metrics}
+        for group, count, group_metrics in zip(labels, counts, metrics_by_group)
+    ]
@@ -0,0 +1,186 @@
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Profundidade máxima de expand= (ex.: films.characters = 2)
+EXPAND_MAX_DEPTH = int(os.getenv("EXPAND_MAX_DEPTH", "2"))
+
+
+def resource_id(url: str) -> str:
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def resource_endpoint(url: str) -> str:
+    return url.rstrip("/").rsplit("/", 2)[-2]
+
+
+def parse_expand(expand: Optional[str], max_depth: Optional[int] = None) -> Dict[str, dict]:
+    # "homeworld,films.characters" -> {"homeworld": {}, "films": {"characters": {}}}
+    max_depth = EXPAND_MAX_DEPTH if max_depth is None else max_depth
+    tree: Dict[str, dict] = {}
+    for path in (expand or "").split(","):
+        parts = [part.strip() for part in path.split(".") if part.strip()]
+        if not parts:
+            continue
+        if len(parts) > max_depth:
+            raise ValueError(f"expand excede a profundidade máxima ({max_depth}): {path}")
+        node = tree
+        for part in parts:
+            node = node.setdefault(part, {})
+    return tree
+
+
+def expand_key(tree: Dict[str, dict], prefix: str = "") -> str:
+    # Forma canônica do expand para chaves de cache
+    paths = []
+    for field in sorted(tree):
+        path = f"{prefix}{field}"
+        paths.append(expand_key(tree[field], f"{path}.") if tree[field] else path)
+    return ",".join(paths)
+
+
+def _id_order(url: str) -> Tuple[int, str]:
+    entity_id = resource_id(url)
+    return (int(entity_id), "") if entity_id.isdigit() else (0, entity_id)
+
+
+class EntityGraph:
+    def __init__(self, collections: Dict[str, List[dict]]):
+        self.collections = collections
+        self.entities: Dict[str, dict] = {}
+        self.endpoints: Dict[str, str] = {}
+        self.urls: Dict[Tuple[str, str], str] = {}
+        # Adjacência nos dois sentidos: url -> endpoint vizinho -> urls
+        self.adjacency: Dict[str, Dict[str, List[str]]] = {}
+
+        for endpoint, items in collections.items():
+            for item in items:
+                url = item.get("url")
+                if url:
+                    self.entities[url] = item
+                    self.endpoints[url] = endpoint
+                    self.urls[(endpoint, resource_id(url))] = url
+
+        self._build_adjacency()
+
+    def _build_adjacency(self):
+        links: Dict[str, Dict[str, Set[str]]] = {}
+        for url, entity in self.entities.items():
+            for field, value in entity.items():
+                if field == "url":
+                    continue
+                refs = value if isinstance(value, list) else [value]
+                for ref in refs:
+                    if not isinstance(ref, str) or ref == url or ref not in self.entities:
+                        continue
+                    links.setdefault(url, {}).setdefault(self.endpoints[ref], set()).add(ref)
+                    links.setdefault(ref, {}).setdefault(self.endpoints[url], set()).add(url)
+
+        # Listas ordenadas por id para respostas estáveis
+        self.adjacency = {
+            url: {
+                endpoint: sorted(refs, key=_id_order)
+                for endpoint, refs in neighbours.items()
+            }
+            for url, neighbours in links.items()
+        }
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.entities
+
+    def __len__(self) -> int:
+        return len(self.entities)
+
+    def get(self, url: str) -> Optional[dict]:
+        return self.entities.get(url)
+
+    def url_for(self, endpoint: str, entity_id: str) -> Optional[str]:
+        return self.urls.get((endpoint, entity_id))
+
+    def related(self, url: str, path: List[str]) -> List[str]:
+        # Cada salto é uma leitura do índice; "films/people" = vizinhos dos vizinhos
+        current = [url]
+        for endpoint in path:
+            found: Dict[str, None] = {}
+            for source in current:
+                for ref in self.adjacency.get(source, {}).get(endpoint, []):
+                    if ref != url:
+                        found[ref] = None
+            current = sorted(found, key=_id_order)
+        return current
+
+    def name(self, url: str) -> Optional[str]:
+        entity = self.entities.get(url)
+        if entity is None:
+            return None
+        return entity.get("name") or entity.get("title")
+
+    def names(self) -> Dict[str, str]:
+        names = {}
+        for url in self.entities:
+            name = self.name(url)
+            if name:
+                names[url] = name
+        return names
+
+    def items(self) -> Iterator[Tuple[str, str, dict]]:
+        # (endpoint, id, entidade) para cada documento do grafo
+        for url, entity in self.entities.items():
+            yield self.endpoints[url], resource_id(url), entity
+
+    def referrers(self, targets: Iterable[str], fields_map: Dict[str, List[str]]) -> Set[str]:
+        # Entidades que apontam para alguma das URLs alvo nos campos resolvíveis
+        targets = set(targets)
+        found = set()
+        if not targets:
+            return found
+        for url, entity in self.entities.items():
+            for field in fields_map.get(self.endpoints[url], []):
+                value = entity.get(field)
+                refs = value if isinstance(value, list) else [value]
+                if any(ref in targets for ref in refs):
+                    found.add(url)
+                    break
+        return found
+
+    def expand(
+        self,
+        item: dict,
+        tree: Dict[str, dict],
+        fields_map: Dict[str, List[str]],
+        endpoint: Optional[str] = None,
+    ) -> dict:
+        # Relacionamentos pedidos viram a entidade inline; os demais, nomes.
+        # endpoint é informado quando o item já vem projetado (talvez sem url)
+        url = item.get("url")
+        if endpoint is None:
+            endpoint = self.endpoints.get(url) or (resource_endpoint(url) if url else None)
+        relations = fields_map.get(endpoint, [])
+        result = self.resolve(item, [field for field in relations if field not in tree])
+        for field, subtree in tree.items():
+            if field not in relations:
+                continue
+            value = item.get(field)
+            if isinstance(value, list):
+                result[field] = [self._expand_ref(ref, subtree, fields_map) for ref in value]
+            elif isinstance(value, str) and value.startswith("http"):
+                result[field] = self._expand_ref(value, subtree, fields_map)
+        return result
+
+    def _expand_ref(
+        self, url: str, tree: Dict[str, dict], fields_map: Dict[str, List[str]]
+    ) -> Optional[Dict[str, Any]]:
+        entity = self.entities.get(url)
+        if entity is None:
+            return None
+        return self.expand(entity, tree, fields_map)
+
+    def resolve(self, item: dict, fields: List[str]) -> dict:
+        # Mesmo formato de resolve_name_fields, sem nenhuma ida ao Redis/SWAPI
+        resolved = dict(item)
+        for field in fields:
+            value = item.get(field)
+            if isinstance(value, list):
+                resolved[field] = [self.name(url) for url in value]
+            elif isinstance(value, str) and value.startswith("http"):
+                resolved[field] = self.name(value)
+        return resolved
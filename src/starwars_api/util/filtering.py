@@ -0,0 +1,63 @@
+from typing import Any, List, Optional
+
+from starwars_api.enums.match_enum import Match
+from starwars_api.util.entity_graph import resource_id
+
+# Nomes dos filtros de array nos DTOs que diferem do campo da SWAPI
+ARRAY_FILTER_FIELDS = {"film": "films", "starship": "starships", "vehicle": "vehicles"}
+
+
+def filter_field(name: str) -> str:
+    return ARRAY_FILTER_FIELDS.get(name, name)
+
+
+def split_values(value: Any) -> List[str]:
+    return [token.strip() for token in str(value).split(",") if token.strip()]
+
+
+def matches_text(value: Optional[str], query: str, match: Match = Match.IEXACT) -> bool:
+    if value is None:
+        return False
+    if match == Match.EXACT:
+        return value == query
+    if match == Match.CONTAINS:
+        return query.casefold() in value.casefold()
+    return value.casefold() == query.casefold()
+
+
+def matches_reference(url: Optional[str], name: Optional[str], query: str, match: Match = Match.IEXACT) -> bool:
+    # Relacionamentos aceitam a URL, o id ou o nome resolvido da entidade
+    if not url:
+        return False
+    return query == url or query == resource_id(url) or matches_text(name, query, match)
+
+
+class DataFilter:
+    @staticmethod
+    def matches(
+        item: dict,
+        resolved: dict,
+        field: str,
+        value: Any,
+        relation_fields: List[str],
+        match: Match = Match.IEXACT,
+    ) -> bool:
+        raw_value = item.get(field)
+
+        if field not in relation_fields:
+            if raw_value is None or isinstance(raw_value, list):
+                return False
+            return matches_text(str(raw_value), str(value), match)
+
+        urls = raw_value if isinstance(raw_value, list) else [raw_value]
+        names = resolved.get(field)
+        names = names if isinstance(names, list) else [names]
+
+        # Arrays: todos os valores pedidos precisam estar presentes
+        return all(
+            any(
+                matches_reference(url, name, query, match)
+                for url, name in zip(urls, names)
+            )
+            for query in split_values(value)
+        )
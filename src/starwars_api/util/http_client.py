@@ -0,0 +1,61 @@
+import importlib.util
+import os
+from typing import Optional
+
+import httpx
+
+
+def _http2_available() -> bool:
+    # HTTP/2 no httpx depende do pacote opcional "h2" (httpx[http2])
+    return importlib.util.find_spec("h2") is not None
+
+
+class SwapiHttpClient:
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ):
+        self.timeout = timeout or float(os.getenv("SWAPI_TIMEOUT", "10.0"))
+        self.max_connections = max_connections or int(
+            os.getenv("SWAPI_MAX_CONNECTIONS", "50")
+        )
+        self.max_keepalive_connections = max_keepalive_connections or int(
+            os.getenv("SWAPI_MAX_KEEPALIVE_CONNECTIONS", "20")
+        )
+        self.keepalive_expiry = keepalive_expiry or float(
+            os.getenv("SWAPI_KEEPALIVE_EXPIRY", "60.0")
+        )
+        if http2 is None:
+            http2 = os.getenv("SWAPI_HTTP2", "true").lower() == "true"
+        self.http2 = http2 and _http2_available()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 5.0)),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                http2=self.http2,
+            )
+        return self._client
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.client.get(url, **kwargs)
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+# Cliente único para todas as chamadas à SWAPI, reaproveitando conexões TLS
+http_client = SwapiHttpClient()
@@ -0,0 +1,99 @@
+from typing import Dict, Iterable, List, Optional, Set
+
+from starwars_api.enums.match_enum import Match
+from starwars_api.util.entity_graph import resource_id
+from starwars_api.util.filtering import split_values
+
+
+def intersect(postings: Iterable[Iterable[int]]) -> Set[int]:
+    # Começa pela menor lista para reduzir o trabalho das interseções
+    ordered = sorted((set(p) for p in postings), key=len)
+    if not ordered:
+        return set()
+    result = ordered[0]
+    for posting in ordered[1:]:
+        if not result:
+            break
+        result &= posting
+    return result
+
+
+class FieldIndex:
+    def __init__(self, field: str, relation: bool = False):
+        self.field = field
+        self.relation = relation
+        # valor normalizado (casefold) -> posições na coleção
+        self.terms: Dict[str, List[int]] = {}
+        # relacionamentos: URL e id -> posições
+        self.refs: Dict[str, List[int]] = {}
+
+    def _add(self, mapping: Dict[str, List[int]], key: str, position: int):
+        posting = mapping.setdefault(key, [])
+        if not posting or posting[-1] != position:
+            posting.append(position)
+
+    def add(self, position: int, value):
+        if not self.relation:
+            if value is not None and not isinstance(value, list):
+                self._add(self.terms, str(value).casefold(), position)
+            return
+
+        for url in value if isinstance(value, list) else [value]:
+            if url:
+                self._add(self.refs, url, position)
+                self._add(self.refs, resource_id(url), position)
+
+    def add_names(self, position: int, names):
+        # Nomes resolvidos dos relacionamentos entram depois, quando disponíveis
+        for name in names if isinstance(names, list) else [names]:
+            if name:
+                self._add(self.terms, str(name).casefold(), position)
+
+    def clear_names(self):
+        # Em relacionamentos, terms guarda só os nomes resolvidos
+        if self.relation:
+            self.terms.clear()
+
+    def _lookup(self, query: str, match: Match) -> Set[int]:
+        needle = query.casefold()
+        if match == Match.CONTAINS:
+            found = set()
+            # Varre os valores distintos, não as linhas
+            for term, posting in self.terms.items():
+                if needle in term:
+                    found.update(posting)
+        else:
+            found = set(self.terms.get(needle, ()))
+        if self.relation:
+            found.update(self.refs.get(query, ()))
+        return found
+
+    def candidates(self, value, match: Match = Match.IEXACT) -> Set[int]:
+        # Para EXACT o resultado é um superconjunto; quem chama confirma
+        if not self.relation:
+            return self._lookup(str(value), match)
+        return intersect(self._lookup(query, match) for query in split_values(value))
+
+
+def build_indexes(items: List[dict], relation_fields: List[str]) -> Dict[str, FieldIndex]:
+    indexes: Dict[str, FieldIndex] = {}
+    for position, item in enumerate(items):
+        for field, value in item.items():
+            index = indexes.get(field)
+            if index is None:
+                index = indexes[field] = FieldIndex(field, field in relation_fields)
+            index.add(position, value)
+    return indexes
+
+
+def index_names(
+    indexes: Dict[str, FieldIndex],
+    resolved: List[dict],
+    positions: Optional[Iterable[int]] = None,
+):
+    # positions: só as linhas informadas (ex.: re-resolvidas depois de falhar)
+    positions = range(len(resolved)) if positions is None else list(positions)
+    for index in indexes.values():
+        if index.relation:
+            for position in positions:
+                index.add_names(position, resolved[position].get(index.field))
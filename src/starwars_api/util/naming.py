@@ -1,82 +1,144 @@
+import asyncio
 import json
-from typing import List, Optional
+import os
+from typing import Any, Dict, List, Optional
 
 import httpx
 from starwars_api.cache.cache import RedisCache
+from starwars_api.cache.cache_instance import redis_cache
+from starwars_api.cache.local_cache import name_cache
+from starwars_api.util.http_client import http_client
+from starwars_api.util.single_flight import SingleFlight
 
+# Limite de requisições simultâneas à SWAPI e prazo total de um lote de misses
+NAME_FETCH_CONCURRENCY = int(os.getenv("NAME_FETCH_CONCURRENCY", "10"))
+NAME_FETCH_DEADLINE = float(os.getenv("NAME_FETCH_DEADLINE", "8.0"))
 
+# Buscas simultâneas da mesma URL (em requisições diferentes) viram uma só
+_fetch_flights = SingleFlight()
 
-async def url_to_name(urls: List[str]) -> List[Optional[str]]:
+
+def _extract_name(data: Any) -> Optional[str]:
+    if isinstance(data, (bytes, bytearray)):
+        data = data.decode("utf-8")
+    if isinstance(data, str):
+        data = json.loads(data)
+    if isinstance(data, dict):
+        return data.get("name") or data.get("title")
+    return None
+
+
+async def _fetch_document(url: str, semaphore: asyncio.Semaphore) -> Optional[dict]:
+    async with semaphore:
+        try:
+            response = await http_client.get(url)
+            if response.status_code == 200:
+                return response.json()
+        except httpx.TimeoutException:
+            print(f"Timeout ao acessar {url}")
+        except httpx.RequestError as e:
+            print(f"Erro na requisição para {url}: {str(e)}")
+        except Exception as e:
+            print(f"Erro inesperado processando {url}: {str(e)}")
+    return None
+
+
+async def fetch_documents(
+    urls: List[str],
+    concurrency: Optional[int] = None,
+    deadline: Optional[float] = None,
+) -> List[Optional[dict]]:
+    if not urls:
+        return []
+
+    semaphore = asyncio.Semaphore(concurrency or NAME_FETCH_CONCURRENCY)
+    deadline = NAME_FETCH_DEADLINE if deadline is None else deadline
+
+    tasks = [
+        asyncio.create_task(
+            _fetch_flights.do(url, lambda url=url: _fetch_document(url, semaphore))
+        )
+        for url in urls
+    ]
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+
+    # O que não terminou dentro do prazo é cancelado e vira None
+    for task in pending:
+        task.cancel()
+    if pending:
+        print(f"Prazo de {deadline}s esgotado: {len(pending)} URLs sem resposta")
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    return [task.result() if task in done else None for task in tasks]
+
+
+async def url_to_name(
+    urls: List[str],
+    concurrency: Optional[int] = None,
+    deadline: Optional[float] = None,
+    cache: Optional[RedisCache] = None,
+) -> List[Optional[str]]:
     try:
-        names = []
         cache_hits = 0
-        cache_misses = 0
-        redis = RedisCache()
-        async with httpx.AsyncClient() as client:
-            for url in urls:
-                try:
-                    cache_key = f"name:{url}"
-                    cached_name = await redis.get(cache_key)
-
-                    if cached_name:
-                        if isinstance(cached_name, (bytes, bytearray)):
-                            cached_name = cached_name.decode("utf-8")
-                        names.append(cached_name)
-                        cache_hits += 1
-                        continue
-
-                    cached_data = await redis.get(url)
-                    if cached_data:
-                        try:
-                            if isinstance(cached_data, (bytes, bytearray)):
-                                cached_str = cached_data.decode("utf-8")
-                            else:
-                                cached_str = str(cached_data)
-
-                            data = json.loads(cached_str)
-                            name = data.get("name") or data.get("title")
-
-                            if name:
-                                await redis.set(cache_key, name, expire=3600)
-                                names.append(name)
-                                cache_hits += 1
-                                continue
-                        except (
-                            json.JSONDecodeError,
-                            AttributeError,
-                            UnicodeDecodeError,
-                        ) as e:
-                            print(f"Erro ao processar cache para {url}: {str(e)}")
-
-                    cache_misses += 1
-                    response = await client.get(url, timeout=10.0)
-
-                    if response.status_code == 200:
-                        data = response.json()
-                        name = data.get("name") or data.get("title")
-                        names.append(name)
-
-                        await redis.set(url, json.dumps(data), expire=3600)
-                        if name:
-                            await redis.set(cache_key, name, expire=3600)
-                    else:
-                        names.append(None)
-
-                except httpx.TimeoutException:
-                    print(f"Timeout ao acessar {url}")
-                    names.append(None)
-                except httpx.RequestError as e:
-                    print(f"Erro na requisição para {url}: {str(e)}")
-                    names.append(None)
-                except Exception as e:
-                    print(f"Erro inesperado processando {url}: {str(e)}")
-                    names.append(None)
+
+        # Cada URL é resolvida uma única vez, mesmo que apareça repetida
+        unique_urls = list(dict.fromkeys(urls))
+        resolved: Dict[str, Optional[str]] = name_cache.get_many(unique_urls)
+        names_to_cache: Dict[str, Any] = {}
+
+        pending = [url for url in unique_urls if url not in resolved]
+        if not pending:
+            return [resolved.get(url) for url in urls]
+
+        redis = cache or redis_cache
+
+        # 1ª ida ao Redis: todas as chaves name:{url} em um único MGET
+        cached_names = await redis.get_many([f"name:{url}" for url in pending])
+        for url, cached_name in zip(pending, cached_names):
+            if cached_name:
+                if isinstance(cached_name, (bytes, bytearray)):
+                    cached_name = cached_name.decode("utf-8")
+                resolved[url] = str(cached_name)
+                name_cache.set(url, resolved[url])
+                cache_hits += 1
+
+        # 2ª ida ao Redis: documentos brutos, somente para as URLs que faltaram
+        pending = [url for url in unique_urls if url not in resolved]
+        cached_docs = await redis.get_many(pending)
+        for url, cached_data in zip(pending, cached_docs):
+            if not cached_data:
+                continue
+            try:
+                name = _extract_name(cached_data)
+            except (json.JSONDecodeError, UnicodeDecodeError) as e:
+                print(f"Erro ao processar cache para {url}: {str(e)}")
+                continue
+            if name:
+                resolved[url] = name
+                name_cache.set(url, name)
+                names_to_cache[f"name:{url}"] = name
+                cache_hits += 1
+
+        pending = [url for url in unique_urls if url not in resolved]
+        cache_misses = len(pending)
+        documents = await fetch_documents(pending, concurrency, deadline)
+        for url, data in zip(pending, documents):
+            name = (data.get("name") or data.get("title")) if data else None
+            resolved[url] = name
+            if data:
+                names_to_cache[url] = data
+            if name:
+                name_cache.set(url, name)
+                names_to_cache[f"name:{url}"] = name
+
+        # Escrita única em pipeline com tudo que foi aprendido nesta chamada
+        await redis.set_many(names_to_cache, expire=3600)
 
         print(
             f"Cache stats - Total URLs: {len(urls)}, Hits: {cache_hits}, Misses: {cache_misses}"
         )
 
-        return names
+        return [resolved.get(url) for url in urls]
     except Exception as e:
         print(f"Erro geral na função url_to_name: {str(e)}")
         return [None] * len(urls)
@@ -0,0 +1,106 @@
+import re
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Campos numéricos que a SWAPI entrega como string ("1,000", "unknown", "n/a")
+NUMERIC_FIELDS = {
+    "people": ["height", "mass"],
+    "films": ["episode_id"],
+    "planets": [
+        "rotation_period",
+        "orbital_period",
+        "diameter",
+        "surface_water",
+        "population",
+    ],
+    "species": ["average_height", "average_lifespan"],
+    "starships": [
+        "cost_in_credits",
+        "length",
+        "max_atmosphering_speed",
+        "crew",
+        "passengers",
+        "cargo_capacity",
+        "hyperdrive_rating",
+        "MGLT",
+    ],
+    "vehicles": [
+        "cost_in_credits",
+        "length",
+        "max_atmosphering_speed",
+        "crew",
+        "passengers",
+        "cargo_capacity",
+    ],
+}
+
+RANGE_PREFIXES = ("min_", "max_")
+
+_NUMBER = re.compile(r"^-?\d+(\.\d+)?$")
+
+
+def parse_number(value: Any) -> Optional[float]:
+    # "unknown", "n/a", "none", intervalos ("30-165") etc. viram None
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    text = value.strip().replace(",", "")
+    if not _NUMBER.match(text):
+        return None
+    return float(text)
+
+
+class NumericColumn:
+    def __init__(self, field: str, values: List[Optional[float]]):
+        self.field = field
+        self.values = values
+        # Posições com valor conhecido, ordenadas pelo valor
+        self.sorted_positions = sorted(
+            (position for position, value in enumerate(values) if value is not None),
+            key=lambda position: values[position],
+        )
+        self.sorted_values = [values[position] for position in self.sorted_positions]
+        self.unknown = len(values) - len(self.sorted_positions)
+
+    @classmethod
+    def from_items(cls, field: str, items: List[dict]) -> "NumericColumn":
+        return cls(field, [parse_number(item.get(field)) for item in items])
+
+    def range(self, minimum: Optional[float] = None, maximum: Optional[float] = None) -> Set[int]:
+        start = 0 if minimum is None else bisect_left(self.sorted_values, minimum)
+        end = len(self.sorted_values) if maximum is None else bisect_right(self.sorted_values, maximum)
+        return set(self.sorted_positions[start:end])
+
+
+def build_columns(endpoint: str, items: List[dict]) -> Dict[str, NumericColumn]:
+    return {
+        field: NumericColumn.from_items(field, items)
+        for field in NUMERIC_FIELDS.get(endpoint, [])
+    }
+
+
+def range_filter_names(fields: Iterable[str]) -> Dict[str, Tuple[str, int]]:
+    # Só min_<campo>/max_<campo> de campos numéricos são faixas; filtros como
+    # max_atmosphering_speed continuam sendo comparação de valor
+    names = {}
+    for field in fields:
+        names[f"{RANGE_PREFIXES[0]}{field}"] = (field, 0)
+        names[f"{RANGE_PREFIXES[1]}{field}"] = (field, 1)
+    return names
+
+
+def split_range_filters(filters: Dict[str, Any], fields: Iterable[str]):
+    # min_height=100&max_height=200 -> {"height": (100, 200)}
+    names = range_filter_names(fields)
+    ranges: Dict[str, List[Optional[float]]] = {}
+    others = {}
+    for name, value in filters.items():
+        if name in names:
+            field, bound = names[name]
+            ranges.setdefault(field, [None, None])[bound] = value
+        else:
+            others[name] = value
+    return {field: tuple(bounds) for field, bounds in ranges.items()}, others
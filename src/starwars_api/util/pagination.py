@@ -0,0 +1,39 @@
+import base64
+import hashlib
+import json
+from typing import Any, Dict, Optional, Tuple
+
+
+def query_fingerprint(*parts: Any) -> str:
+    content = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.blake2b(content, digest_size=8).hexdigest()
+
+
+def encode_cursor(offset: int, limit: int, query: str) -> str:
+    payload = json.dumps({"o": offset, "l": limit, "q": query}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, query: str) -> Tuple[int, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload: Dict[str, Any] = json.loads(base64.urlsafe_b64decode(padded))
+        offset, limit = int(payload["o"]), int(payload["l"])
+    except Exception:
+        raise ValueError("Cursor inválido")
+    # O cursor só vale para a mesma combinação de filtros/ordenação
+    if payload.get("q") != query or offset < 0 or limit < 1:
+        raise ValueError("Cursor inválido para esta consulta")
+    return offset, limit
+
+
+def page_window(
+    offset: int = 0,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    query: str = "",
+) -> Tuple[int, Optional[int]]:
+    if cursor:
+        cursor_offset, cursor_limit = decode_cursor(cursor, query)
+        return cursor_offset, limit or cursor_limit
+    return offset, limit
@@ -0,0 +1,26 @@
+from typing import List, Optional, Tuple
+
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    # Forma canônica (ordenada, sem repetição) para reaproveitar o mesmo cache
+    if not fields:
+        return None
+    parsed = tuple(sorted({field.strip() for field in fields.split(",") if field.strip()}))
+    return parsed or None
+
+
+def projection_key(fields: Optional[Tuple[str, ...]]) -> str:
+    return f":fields:{','.join(fields)}" if fields else ""
+
+
+def project(item: dict, fields: Optional[Tuple[str, ...]]) -> dict:
+    if not fields:
+        return item
+    return {field: item[field] for field in fields if field in item}
+
+
+def projected_relations(relation_fields: List[str], fields: Optional[Tuple[str, ...]]) -> List[str]:
+    # Relacionamentos fora da projeção nunca passam pelo url_to_name
+    if not fields:
+        return relation_fields
+    return [field for field in relation_fields if field in fields]
@@ -1,4 +1,3 @@
-
 from starwars_api.util.naming import url_to_name
 
 
@@ -10,4 +9,33 @@ async def resolve_name_fields(data: dict, fields: list[str]) -> dict:
             elif isinstance(data[field], str) and data[field].startswith("http"):
                 resolved = await url_to_name([data[field]])
                 data[field] = resolved[0] if resolved else None
-    return data
\ No newline at end of file
+    return data
+
+
+def collect_urls(items: list[dict], fields: list[str]) -> list[str]:
+    urls = {}
+    for item in items:
+        for field in fields:
+            value = item.get(field)
+            if isinstance(value, list):
+                urls.update(dict.fromkeys(value))
+            elif isinstance(value, str) and value.startswith("http"):
+                urls[value] = None
+    return list(urls)
+
+
+async def resolve_name_fields_many(items: list[dict], fields: list[str]) -> list[dict]:
+    # Resolve o conjunto de URLs únicas de todos os itens de uma só vez
+    urls = collect_urls(items, fields)
+    if not urls:
+        return items
+
+    names = dict(zip(urls, await url_to_name(urls)))
+    for item in items:
+        for field in fields:
+            value = item.get(field)
+            if isinstance(value, list):
+                item[field] = [names.get(url) for url in value]
+            elif isinstance(value, str) and value.startswith("http"):
+                item[field] = names.get(value)
+    return items
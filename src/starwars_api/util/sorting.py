@@ -1,6 +1,29 @@
-from typing import List, Optional
+from typing import Any, List, Optional, Tuple
 
 from starwars_api.enums.order_enum import Order
+from starwars_api.util.numeric import parse_number
+
+
+def sort_key(value: Any, number: Optional[float] = None) -> tuple:
+    if number is None:
+        number = parse_number(value)
+    if number is not None:
+        return (0, number)  # Números como tupla para evitar comparação direta
+    return (1, str(value))  # Strings como tupla separada
+
+
+def parse_sort_keys(sort_by: Optional[str], order: Order = Order.ASC) -> List[Tuple[str, bool]]:
+    # "gender,-height": "-" inverte a direção de `order` para aquele campo
+    keys = []
+    for field in (sort_by or "").split(","):
+        field = field.strip()
+        if not field:
+            continue
+        descending = order == Order.DESC
+        if field.startswith("-"):
+            field, descending = field[1:], not descending
+        keys.append((field, descending))
+    return keys
 
 
 class DataSorter:
@@ -13,16 +36,6 @@ class DataSorter:
 
         reverse_order = order == Order.DESC
 
-        def sort_key(item):
-            value = item.get(sort_by, "")
-            if isinstance(value, str) and value.isdigit():
-                return (
-                    0,
-                    int(value),
-                )  # Números como tupla para evitar comparação direta
-            try:
-                return (0, float(value))
-            except (ValueError, TypeError):
-                return (1, str(value))  # Strings como tupla separada
-
-        return sorted(data, key=sort_key, reverse=reverse_order)
+        return sorted(
+            data, key=lambda item: sort_key(item.get(sort_by, "")), reverse=reverse_order
+        )
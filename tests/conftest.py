@@ -1,2 +1,46 @@
 # Configuração global para testes assíncronos
+import pytest
+
+from starwars_api.cache.cache import RedisCache
+from starwars_api.cache.local_cache import name_cache
+
 pytest_plugins = ("pytest_asyncio",)
+
+
+@pytest.fixture(autouse=True)
+def clear_name_cache():
+    # O cache L1 de nomes é global ao processo; isola cada teste
+    name_cache.clear()
+    yield
+    name_cache.clear()
+
+
+class FakeRedisConnection:
+    # Subconjunto do cliente Redis usado por locks e jobs, guardado em memória
+    def __init__(self):
+        self.store = {}
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def delete(self, *keys):
+        return sum(1 for key in keys if self.store.pop(key, None) is not None)
+
+    async def eval(self, script, numkeys, key, token):
+        if self.store.get(key) == token:
+            del self.store[key]
+            return 1
+        return 0
+
+
+@pytest.fixture
+def fake_redis_cache():
+    cache = RedisCache(ttl_jitter=0)
+    cache.connection = FakeRedisConnection()
+    return cache
@@ -0,0 +1,208 @@
+import asyncio
+import json
+import zlib
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from starwars_api.cache.cache import RedisCache
+from starwars_api.cache.codec import CODECS, COMPRESSORS, MAGIC, CacheCodec
+from starwars_api.cache.snapshot import (
+    CacheSnapshot,
+    decode_snapshot,
+    encode_snapshot,
+)
+
+
+class TestCacheCodec:
+    @pytest.fixture
+    def film(self):
+        return {
+            "title": "A New Hope",
+            "episode_id": 4,
+            "opening_crawl": "It is a period of civil war. " * 50,
+            "characters": ["Luke Skywalker", "C-3PO"],
+        }
+
+    @pytest.mark.parametrize("codec", sorted(CODECS))
+    def test_round_trip_for_every_available_codec(self, codec, film):
+        cache_codec = CacheCodec(codec=codec, compression="none")
+
+        encoded = cache_codec.encode(film)
+
+        assert encoded.startswith(MAGIC)
+        assert cache_codec.decode(encoded) == film
+
+    @pytest.mark.parametrize("compression", sorted(COMPRESSORS))
+    def test_compression_above_threshold(self, compression, film):
+        cache_codec = CacheCodec(
+            codec="json", compression=compression, compression_threshold=100
+        )
+
+        encoded = cache_codec.encode(film)
+
+        assert encoded[len(MAGIC) + 1] == COMPRESSORS[compression].id
+        assert cache_codec.decode(encoded) == film
+
+    def test_small_values_are_not_compressed(self):
+        cache_codec = CacheCodec(
+            codec="json", compression="zlib", compression_threshold=1024
+        )
+
+        encoded = cache_codec.encode("Tatooine")
+
+        assert encoded[len(MAGIC) + 1] == COMPRESSORS["none"].id
+        assert cache_codec.decode(encoded) == "Tatooine"
+
+    def test_header_makes_values_self_describing(self, film):
+        writer = CacheCodec(codec="json", compression="zlib", compression_threshold=0)
+        reader = CacheCodec(
+            codec=sorted(CODECS)[-1], compression="none", compression_threshold=0
+        )
+
+        assert reader.decode(writer.encode(film)) == film
+
+    def test_legacy_json_entries_are_readable(self, film):
+        cache_codec = CacheCodec()
+
+        assert cache_codec.decode(json.dumps(film).encode("utf-8")) == film
+        assert cache_codec.decode(b"Tatooine") == "Tatooine"
+        assert cache_codec.decode(None) is None
+
+    def test_msgpack_codec_is_always_available(self):
+        # msgpack é dependência declarada: sem ele, novas escritas cairiam em JSON
+        assert "msgpack" in CODECS
+
+    def test_unknown_codec_is_rejected(self):
+        with pytest.raises(ValueError):
+            CacheCodec(codec="pickle")
+
+    def test_corrupted_value_is_a_cache_miss(self):
+        cache = RedisCache(codec=CacheCodec(codec="json", compression="zlib"))
+        corrupted = MAGIC + bytes((0, COMPRESSORS["zlib"].id)) + b"not-zlib"
+
+        assert cache._deserialize(corrupted) is None
+        assert cache._deserialize(MAGIC + bytes((0, 0)) + zlib.compress(b"{}")) is None
+
+    def test_bytes_are_stored_as_raw_payload(self):
+        cache_codec = CacheCodec(compression="zlib", compression_threshold=10)
+        body = b'[{"name":"Luke Skywalker","height":"172"}]'
+
+        encoded = cache_codec.encode(body)
+
+        assert cache_codec.decode(encoded) == body
+        assert isinstance(cache_codec.decode(encoded), bytes)
+
+
+class TestRedisLock:
+    @pytest.mark.asyncio
+    async def test_lock_is_exclusive_and_released(self, fake_redis_cache):
+        async with fake_redis_cache.lock("people_processed") as first:
+            async with fake_redis_cache.lock("people_processed") as second:
+                assert first.acquired is True
+                assert second.acquired is False
+
+        assert "lock:people_processed" not in fake_redis_cache.connection.store
+
+    @pytest.mark.asyncio
+    async def test_waiter_acquires_after_holder_releases(self, fake_redis_cache):
+        async def holder():
+            async with fake_redis_cache.lock("people_processed"):
+                await asyncio.sleep(0.1)
+
+        task = asyncio.create_task(holder())
+        await asyncio.sleep(0)
+
+        async with fake_redis_cache.lock("people_processed", wait=1.0) as waiter:
+            assert waiter.acquired is True
+            assert waiter.waited is True
+        await task
+
+    @pytest.mark.asyncio
+    async def test_release_does_not_delete_foreign_lock(self, fake_redis_cache):
+        async with fake_redis_cache.lock("people_processed") as lock:
+            fake_redis_cache.connection.store[lock.key] = "other-worker"
+
+        store = fake_redis_cache.connection.store
+        assert store["lock:people_processed"] == "other-worker"
+
+
+class TestTtlJitter:
+    def test_jitter_only_extends_ttl(self):
+        cache = RedisCache(ttl_jitter=0.1)
+
+        ttls = {cache._jittered(1000) for _ in range(200)}
+
+        assert min(ttls) >= 1000
+        assert max(ttls) <= 1100
+        assert len(ttls) > 1
+
+    def test_explicit_jitter_and_disabled_jitter(self):
+        assert RedisCache(ttl_jitter=0)._jittered(1000) == 1000
+        assert 1000 <= RedisCache(ttl_jitter=0)._jittered(1000, jitter=5) <= 1005
+
+
+class TestCacheSnapshot:
+    @pytest.fixture
+    def records(self):
+        codec = CacheCodec()
+        return [
+            ("people_processed", codec.encode(b'[{"name":"Luke Skywalker"}]'), 86_000_000),
+            ("name:https://swapi.info/api/films/1", codec.encode("A New Hope"), 3_500_000),
+            ("warmup:fingerprints", codec.encode({"a": "b"}), -1),
+        ]
+
+    def test_round_trip(self, records):
+        data = encode_snapshot(records)
+
+        assert data.startswith(b"SWSNAP")
+        assert decode_snapshot(data) == records
+
+    def test_rejects_unknown_or_truncated_files(self, records):
+        with pytest.raises(ValueError):
+            decode_snapshot(b"not a snapshot")
+        with pytest.raises(ValueError):
+            decode_snapshot(encode_snapshot(records)[:-5])
+
+    @pytest.mark.asyncio
+    async def test_export_skips_coordination_keys_and_load_restores(self, records):
+        redis = MagicMock()
+        redis.scan_keys = AsyncMock(
+            return_value=[key for key, _, _ in records] + ["lock:people", "warmup:current"]
+        )
+        redis.dump_many = AsyncMock(
+            side_effect=lambda keys: [
+                (value, ttl) for key, value, ttl in records if key in keys
+            ]
+        )
+        redis.restore_many = AsyncMock(return_value=True)
+
+        snapshot = CacheSnapshot(redis, batch_size=2)
+        data, report = await snapshot.export()
+
+        assert report["keys"] == 3
+        assert redis.dump_many.await_count == 2
+
+        result = await snapshot.load(data)
+
+        assert result == {**result, "status": "completed", "keys": 3, "skipped_keys": 0}
+        restored = [
+            record for call in redis.restore_many.await_args_list for record in call.args[0]
+        ]
+        assert restored == records
+
+    @pytest.mark.asyncio
+    async def test_load_only_restores_cache_namespaces(self, records):
+        redis = MagicMock()
+        redis.restore_many = AsyncMock(return_value=True)
+        foreign = [
+            ("lock:warmup", b"token", 60_000),
+            ("session:42", b"outro sistema", -1),
+            ("name:https://evil.example/api/people/1", b"x", -1),
+        ]
+
+        result = await CacheSnapshot(redis).load(encode_snapshot(records + foreign))
+
+        assert result["keys"] == 3
+        assert result["skipped_keys"] == 3
+        assert redis.restore_many.await_args.args[0] == records
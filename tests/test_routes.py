@@ -1,7 +1,10 @@
+import os
+import time
 from unittest.mock import patch
 
 import pytest
 from fastapi.testclient import TestClient
+from jose import jwt
 
 from starwars_api.main import app
 
@@ -67,6 +70,78 @@ class TestAuthRouter:
             assert "error" in data
 
 
+class TestWarmCacheRoutes:
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+
+    def test_redis_down_returns_503(self, client):
+        with patch(
+            "starwars_api.routes.auth_router.redis_cache.connect",
+            side_effect=ConnectionError("Redis connection failed"),
+        ):
+            response = client.post("/warm-cache")
+
+        assert response.status_code == 503
+
+    def test_lock_failure_from_redis_returns_503(self, client):
+        with patch("starwars_api.routes.auth_router.redis_cache.connect"), patch(
+            "starwars_api.routes.auth_router.warmup_jobs.start",
+            side_effect=ConnectionError("Redis indisponível"),
+        ):
+            response = client.post("/warm-cache")
+
+        assert response.status_code == 503
+
+
+def _token(role):
+    payload = {"sub": "test", "role": role, "exp": int(time.time()) + 60}
+    return jwt.encode(
+        payload, os.getenv("JWT_SECRET_KEY", "your_secret_key"), algorithm="HS256"
+    )
+
+
+class TestCacheSnapshotRoutes:
+    @pytest.fixture
+    def client(self):
+        return TestClient(app)
+
+    def test_disabled_by_default(self, client):
+        headers = {"Authorization": f"Bearer {_token('admin')}"}
+
+        assert client.get("/cache-snapshot", headers=headers).status_code == 404
+        assert client.post("/cache-snapshot", headers=headers).status_code == 404
+
+    def test_requires_admin_role(self, client):
+        with patch("starwars_api.routes.auth_router.SNAPSHOT_ROUTES_ENABLED", True):
+            anonymous = client.get("/cache-snapshot")
+            user = client.post(
+                "/cache-snapshot",
+                content=b"x",
+                headers={"Authorization": f"Bearer {_token('user')}"},
+            )
+
+        assert anonymous.status_code in (401, 403)
+        assert user.status_code == 403
+
+    def test_rejects_oversized_body(self, client):
+        with patch(
+            "starwars_api.routes.auth_router.SNAPSHOT_ROUTES_ENABLED", True
+        ), patch("starwars_api.routes.auth_router.SNAPSHOT_MAX_BYTES", 8), patch(
+            "starwars_api.routes.auth_router.redis_cache.connect"
+        ), patch(
+            "starwars_api.routes.auth_router.cache_snapshot.load"
+        ) as load:
+            response = client.post(
+                "/cache-snapshot",
+                content=b"x" * 64,
+                headers={"Authorization": f"Bearer {_token('admin')}"},
+            )
+
+        assert response.status_code == 413
+        load.assert_not_called()
+
+
 class TestSwapiRouter:
     @pytest.fixture
     def client(self):
@@ -1,3 +1,5 @@
+import asyncio
+import heapq
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -5,9 +7,20 @@ import httpx
 import pytest
 from fastapi import HTTPException
 
+from starwars_api.enums.match_enum import Match
 from starwars_api.enums.order_enum import Order
-from starwars_api.routes.dto import PeopleFilterDto
-from starwars_api.services.swapi_service import ENDPOINT_FIELDS_MAP, SwapiService
+from starwars_api.routes.dto import PeopleFilterDto, StarshipsFilterDto
+from starwars_api.services.swapi_service import (
+    ENDPOINT_FIELDS_MAP,
+    PROCESSED_HARD_TTL,
+    PROCESSED_SOFT_TTL,
+    PROCESSED_TTL_JITTER,
+    SwapiService,
+)
+from starwars_api.cache.local_cache import name_cache
+from starwars_api.services.collection_store import CollectionStore
+from starwars_api.util.entity_graph import EntityGraph
+from starwars_api.util.sorting import DataSorter
 
 
 class TestSwapiService:
@@ -18,6 +31,10 @@ class TestSwapiService:
     @pytest.fixture
     def mock_redis_cache(self):
         mock_cache = AsyncMock()
+        mock_cache.lock = MagicMock()
+        mock_cache.lock.return_value.__aenter__.return_value = MagicMock(
+            acquired=True, waited=False
+        )
         return mock_cache
 
     @pytest.fixture
@@ -39,6 +56,23 @@ class TestSwapiService:
             },
         ]
 
+    @pytest.mark.asyncio
+    async def test_injected_cache_is_used(self, mock_redis_cache):
+        cached_data = {"name": "Luke Skywalker"}
+        mock_redis_cache.get.return_value = cached_data
+        service = SwapiService(mock_redis_cache)
+
+        result = await service._make_request("people", "1")
+
+        assert result == cached_data
+        mock_redis_cache.get.assert_called_once_with("people:1")
+
+    def test_default_cache_is_shared_pool(self):
+        from starwars_api.cache.cache_instance import redis_cache
+
+        assert SwapiService().redis is redis_cache
+        assert SwapiService().redis is SwapiService().redis
+
     @pytest.mark.asyncio
     async def test_get_cache_key_simple(self, swapi_service):
         key = await swapi_service._get_cache_key("people")
@@ -135,12 +169,12 @@ class TestSwapiService:
     ):
         with patch("starwars_api.services.swapi_service.DataSorter.sort") as mock_sort:
             with patch(
-                "starwars_api.services.swapi_service.resolve_name_fields"
+                "starwars_api.services.swapi_service.resolve_name_fields_many"
             ) as mock_resolve:
                 mock_sort.return_value = sample_people_data
                 mock_resolve.side_effect = (
                     lambda x, _: x
-                )  # Retorna o item sem modificação
+                )  # Retorna os itens sem modificação
 
                 result = await swapi_service._process_response(
                     sample_people_data, "people", "name", Order.ASC
@@ -148,25 +182,27 @@ class TestSwapiService:
 
                 assert len(result) == 2
                 mock_sort.assert_called_once_with(sample_people_data, "name", Order.ASC)
-                assert mock_resolve.call_count == 2
+                mock_resolve.assert_called_once_with(
+                    sample_people_data, ENDPOINT_FIELDS_MAP["people"]
+                )
 
     @pytest.mark.asyncio
     async def test_list_resources_cache_hit(
         self, swapi_service, mock_redis_cache, sample_people_data
     ):
-        mock_redis_cache.get.return_value = sample_people_data
+        mock_redis_cache.get_with_ttl.return_value = (sample_people_data, PROCESSED_HARD_TTL)
 
         with patch("starwars_api.services.swapi_service.redis_cache", mock_redis_cache):
             result = await swapi_service.list_resources("people")
 
             assert result == sample_people_data
-            mock_redis_cache.get.assert_called_once()
+            mock_redis_cache.get_with_ttl.assert_called_once()
 
     @pytest.mark.asyncio
     async def test_list_resources_cache_miss(
         self, swapi_service, mock_redis_cache, sample_people_data
     ):
-        mock_redis_cache.get.return_value = None
+        mock_redis_cache.get_with_ttl.return_value = (None, -2)
 
         with patch.object(
             swapi_service, "_make_request", return_value=sample_people_data
@@ -197,21 +233,183 @@ class TestSwapiService:
 
             assert exc_info.value.status_code == 404
 
+    @pytest.mark.asyncio
+    async def test_list_resources_raw_hit_returns_cached_bytes(
+        self, swapi_service, mock_redis_cache
+    ):
+        body = b'[{"name":"Luke Skywalker"}]'
+        mock_redis_cache.get_with_ttl.return_value = (body, PROCESSED_HARD_TTL)
+
+        with patch("starwars_api.services.swapi_service.redis_cache", mock_redis_cache):
+            raw = await swapi_service.list_resources("people", raw=True)
+            decoded = await swapi_service.list_resources("people")
+
+        assert raw is body
+        assert decoded == [{"name": "Luke Skywalker"}]
+
+    @pytest.mark.asyncio
+    async def test_list_resources_miss_caches_serialized_body(
+        self, swapi_service, mock_redis_cache, sample_people_data
+    ):
+        mock_redis_cache.get_with_ttl.return_value = (None, -2)
+
+        with patch.object(
+            swapi_service, "_make_request", return_value=sample_people_data
+        ):
+            with patch.object(
+                swapi_service, "_process_response", return_value=sample_people_data
+            ):
+                with patch(
+                    "starwars_api.services.swapi_service.redis_cache", mock_redis_cache
+                ):
+                    result = await swapi_service.list_resources("people", raw=True)
+
+        cached_body = mock_redis_cache.set.call_args.args[1]
+        assert isinstance(cached_body, bytes)
+        assert result == cached_body
+        assert json.loads(result) == sample_people_data
+
+    @pytest.mark.asyncio
+    async def test_list_resources_fresh_hit_does_not_refresh(
+        self, mock_redis_cache, sample_people_data
+    ):
+        mock_redis_cache.get_with_ttl.return_value = (
+            sample_people_data,
+            PROCESSED_HARD_TTL - PROCESSED_SOFT_TTL + 1,
+        )
+        service = SwapiService(mock_redis_cache)
+
+        with patch.object(service, "_schedule_refresh") as mock_schedule:
+            await service.list_resources("people")
+
+        mock_schedule.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_list_resources_stale_hit_refreshes_in_background(
+        self, mock_redis_cache, sample_people_data
+    ):
+        stale_ttl = PROCESSED_HARD_TTL - PROCESSED_SOFT_TTL - 1
+        mock_redis_cache.get_with_ttl.return_value = (b"[]", stale_ttl)
+        service = SwapiService(mock_redis_cache)
+        release = asyncio.Event()
+
+        async def slow_request(*args):
+            await release.wait()
+            return sample_people_data
+
+        with patch.object(
+            service, "_make_request", side_effect=slow_request
+        ) as mock_request:
+            with patch.object(
+                service, "_process_response", return_value=sample_people_data
+            ):
+                first = await service.list_resources("people")
+                second = await service.list_resources("people")
+                assert len(service._refresh_tasks) == 1
+                release.set()
+                await asyncio.gather(*service._refresh_tasks.values())
+
+        assert first == [] and second == []
+        mock_request.assert_called_once_with("people", None, None, True)
+        key, body = mock_redis_cache.set.call_args.args
+        assert key == "people_processed"
+        assert json.loads(body) == sample_people_data
+        mock_redis_cache.lock.assert_called_once_with(
+            "refresh:people_processed", expire=60
+        )
+
+    @pytest.mark.asyncio
+    async def test_refresh_skipped_when_another_worker_holds_lock(
+        self, mock_redis_cache
+    ):
+        mock_redis_cache.lock.return_value.__aenter__.return_value = MagicMock(
+            acquired=False, waited=False
+        )
+        service = SwapiService(mock_redis_cache)
+        compute = AsyncMock()
+
+        await service._refresh("people_processed", compute)
+
+        compute.assert_not_called()
+        mock_redis_cache.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_list_resources_rechecks_cache_after_waiting_for_lock(
+        self, mock_redis_cache, sample_people_data
+    ):
+        mock_redis_cache.get_with_ttl.side_effect = [
+            (None, -2),
+            (b"[]", PROCESSED_HARD_TTL),
+        ]
+        mock_redis_cache.lock.return_value.__aenter__.return_value = MagicMock(
+            acquired=True, waited=True
+        )
+        service = SwapiService(mock_redis_cache)
+
+        with patch.object(service, "_make_request") as mock_request:
+            result = await service.list_resources("people")
+
+        assert result == []
+        mock_request.assert_not_called()
+        mock_redis_cache.set.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_processed_results_written_with_jitter(
+        self, mock_redis_cache, sample_people_data
+    ):
+        mock_redis_cache.get_with_ttl.return_value = (None, -2)
+        service = SwapiService(mock_redis_cache)
+
+        with patch.object(service, "_make_request", return_value=sample_people_data):
+            with patch.object(
+                service, "_process_response", return_value=sample_people_data
+            ):
+                await service.list_resources("people")
+
+        assert mock_redis_cache.set.call_args.kwargs["expire"] == PROCESSED_HARD_TTL
+        assert mock_redis_cache.set.call_args.kwargs["jitter"] == PROCESSED_TTL_JITTER
+
+    @pytest.mark.asyncio
+    async def test_concurrent_identical_requests_share_one_computation(
+        self, mock_redis_cache, sample_people_data
+    ):
+        mock_redis_cache.get_with_ttl.return_value = (None, -2)
+        service = SwapiService(mock_redis_cache)
+
+        async def slow_request(*args):
+            await asyncio.sleep(0.01)
+            return sample_people_data
+
+        with patch.object(
+            service, "_make_request", side_effect=slow_request
+        ) as mock_request:
+            with patch.object(
+                service, "_process_response", return_value=sample_people_data
+            ):
+                results = await asyncio.gather(
+                    *[service.list_resources("people") for _ in range(20)]
+                )
+
+        assert all(result == sample_people_data for result in results)
+        assert results[0] is not results[1]
+        mock_request.assert_called_once()
+        mock_redis_cache.set.assert_called_once()
+
     @pytest.mark.asyncio
     async def test_get_resource_cache_hit(self, swapi_service, mock_redis_cache):
         cached_data = {"name": "Luke Skywalker"}
-        mock_redis_cache.get.return_value = cached_data
+        mock_redis_cache.get_with_ttl.return_value = (cached_data, PROCESSED_HARD_TTL)
 
         with patch("starwars_api.services.swapi_service.redis_cache", mock_redis_cache):
             result = await swapi_service.get_resource("people", "1")
 
             assert result == cached_data
-            mock_redis_cache.get.assert_called_once_with("people_1_processed")
+            mock_redis_cache.get_with_ttl.assert_called_once_with("people_1_processed")
 
     @pytest.mark.asyncio
     async def test_get_resource_cache_miss(self, swapi_service, mock_redis_cache):
         resource_data = {"name": "Luke Skywalker"}
-        mock_redis_cache.get.return_value = None
+        mock_redis_cache.get_with_ttl.return_value = (None, -2)
 
         with patch.object(swapi_service, "_make_request", return_value=resource_data):
             with patch.object(
@@ -225,6 +423,85 @@ class TestSwapiService:
                     assert result == resource_data
                     mock_redis_cache.set.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_get_resource_projection_resolves_only_requested_fields(
+        self, swapi_service, mock_redis_cache, sample_people_data
+    ):
+        mock_redis_cache.get_with_ttl.return_value = (None, -2)
+
+        with patch.object(
+            swapi_service, "_make_request", return_value=dict(sample_people_data[0])
+        ):
+            with patch(
+                "starwars_api.services.swapi_service.resolve_name_fields",
+                side_effect=lambda data, fields: {**data, "films": ["A New Hope"]},
+            ) as resolve:
+                with patch(
+                    "starwars_api.services.swapi_service.redis_cache", mock_redis_cache
+                ):
+                    result = await swapi_service.get_resource(
+                        "people", "1", fields="name, films,name"
+                    )
+
+        resolve.assert_called_once_with(
+            {"name": "Luke Skywalker", "films": ["https://swapi.info/api/films/1"]},
+            ["films"],
+        )
+        assert result == {"name": "Luke Skywalker", "films": ["A New Hope"]}
+        key = mock_redis_cache.get_with_ttl.call_args.args[0]
+        assert key == "people_1_processed:fields:films,name"
+
+    @pytest.mark.asyncio
+    async def test_list_resources_projection_key_and_relations(
+        self, swapi_service, mock_redis_cache, sample_people_data
+    ):
+        mock_redis_cache.get_with_ttl.return_value = (None, -2)
+
+        with patch.object(
+            swapi_service, "_make_request", return_value=sample_people_data
+        ):
+            with patch(
+                "starwars_api.services.swapi_service.resolve_name_fields_many",
+                side_effect=lambda items, fields: items,
+            ) as resolve:
+                with patch(
+                    "starwars_api.services.swapi_service.redis_cache", mock_redis_cache
+                ):
+                    result = await swapi_service.list_resources(
+                        "people", fields="height,name"
+                    )
+
+        assert resolve.call_args.args[1] == []
+        assert result == [
+            {"height": "172", "name": "Luke Skywalker"},
+            {"height": "167", "name": "C-3PO"},
+        ]
+        key = mock_redis_cache.get_with_ttl.call_args.args[0]
+        assert key == "people_processed:fields:height,name"
+
+    @pytest.mark.asyncio
+    async def test_unknown_projection_field_does_not_create_cache_key(
+        self, swapi_service, mock_redis_cache
+    ):
+        with patch.object(swapi_service, "_make_request") as request:
+            with patch(
+                "starwars_api.services.swapi_service.redis_cache", mock_redis_cache
+            ):
+                with pytest.raises(HTTPException) as exc:
+                    await swapi_service.list_resources("people", fields="name,a")
+                with pytest.raises(HTTPException):
+                    await swapi_service.get_resource("people", "1", fields="b")
+                # Campos comuns a todo recurso continuam válidos
+                mock_redis_cache.get_with_ttl.return_value = (b"[]", PROCESSED_HARD_TTL)
+                await swapi_service.list_resources("people", fields="name,url")
+
+        assert exc.value.status_code == 400
+        assert "a" in exc.value.detail
+        request.assert_not_called()
+        mock_redis_cache.set.assert_not_called()
+        keys = [call.args[0] for call in mock_redis_cache.get_with_ttl.call_args_list]
+        assert keys == ["people_processed:fields:name,url"]
+
     @pytest.mark.asyncio
     async def test_list_people(self, swapi_service):
         filters = PeopleFilterDto(name="Luke")
@@ -286,3 +563,467 @@ class TestSwapiService:
             assert endpoint in ENDPOINT_FIELDS_MAP
             assert isinstance(ENDPOINT_FIELDS_MAP[endpoint], list)
             assert len(ENDPOINT_FIELDS_MAP[endpoint]) > 0
+
+
+PLANET_NAMES = {
+    "https://swapi.info/api/planets/1": "Tatooine",
+    "https://swapi.info/api/planets/8": "Naboo",
+    "https://swapi.info/api/films/1": "A New Hope",
+    "https://swapi.info/api/films/4": "The Phantom Menace",
+}
+
+
+async def fake_resolve_many(items, fields):
+    for item in items:
+        for field in fields:
+            value = item.get(field)
+            if isinstance(value, list):
+                item[field] = [PLANET_NAMES.get(url) for url in value]
+            elif isinstance(value, str) and value.startswith("http"):
+                item[field] = PLANET_NAMES.get(value)
+    return items
+
+
+class TestLocalFiltering:
+    @pytest.fixture
+    def people(self):
+        return [
+            {
+                "name": "Luke Skywalker",
+                "eye_color": "blue",
+                "homeworld": "https://swapi.info/api/planets/1",
+                "films": ["https://swapi.info/api/films/1"],
+                "url": "https://swapi.info/api/people/1",
+            },
+            {
+                "name": "Padmé Amidala",
+                "eye_color": "brown",
+                "homeworld": "https://swapi.info/api/planets/8",
+                "films": [
+                    "https://swapi.info/api/films/4",
+                    "https://swapi.info/api/films/1",
+                ],
+                "url": "https://swapi.info/api/people/35",
+            },
+        ]
+
+    @pytest.fixture(autouse=True)
+    def resolve(self):
+        with patch(
+            "starwars_api.services.collection_store.resolve_name_fields_many",
+            side_effect=fake_resolve_many,
+        ):
+            yield
+
+    @pytest.mark.asyncio
+    async def test_filter_combinations_share_one_collection_fetch(self, people):
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=people) as request:
+            blue = await service.list_people(PeopleFilterDto(eye_color="BLUE"))
+            naboo = await service.list_people(PeopleFilterDto(homeworld="naboo"))
+            both = await service.list_people(PeopleFilterDto(film="1,4"))
+
+        # Coleções referenciadas (planets, films) também são lidas, uma vez cada
+        assert [c.args for c in request.await_args_list].count(("people",)) == 1
+        assert [p["name"] for p in blue] == ["Luke Skywalker"]
+        assert naboo[0]["homeworld"] == "Naboo"
+        assert [p["name"] for p in both] == ["Padmé Amidala"]
+
+    @pytest.mark.asyncio
+    async def test_match_modes(self, people):
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=people):
+            exact = await service.list_people(
+                PeopleFilterDto(name="luke skywalker"), match=Match.EXACT
+            )
+            contains = await service.list_people(
+                PeopleFilterDto(name="sky"), match=Match.CONTAINS
+            )
+
+        assert exact == []
+        assert [p["name"] for p in contains] == ["Luke Skywalker"]
+
+    @pytest.mark.asyncio
+    async def test_range_filters_use_numeric_columns(self, people):
+        people[0]["height"] = "172"
+        people[1]["height"] = "unknown"
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=people):
+            tall = await service.list_people(PeopleFilterDto(min_height=170))
+            collection = await service.collections.get("people")
+
+        assert [p["name"] for p in tall] == ["Luke Skywalker"]
+        assert collection.columns["height"].values == [172.0, None]
+
+    @pytest.mark.asyncio
+    async def test_max_atmosphering_speed_is_an_equality_filter(self):
+        starships = [
+            {"name": "X-wing", "max_atmosphering_speed": "1050", "pilots": [], "films": []},
+            {"name": "Y-wing", "max_atmosphering_speed": "1000km", "pilots": [], "films": []},
+        ]
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=starships):
+            result = await service.list_starships(
+                StarshipsFilterDto(max_atmosphering_speed="1050")
+            )
+            fastest = await service.list_starships(
+                StarshipsFilterDto(min_max_atmosphering_speed=1010)
+            )
+
+        assert [s["name"] for s in result] == ["X-wing"]
+        assert [s["name"] for s in fastest] == ["X-wing"]
+
+    @pytest.mark.asyncio
+    async def test_sorting_uses_precomputed_permutations(self):
+        crew = [
+            {"name": "Luke Skywalker", "gender": "male", "height": "172"},
+            {"name": "Leia Organa", "gender": "female", "height": "150"},
+            {"name": "Chewbacca", "gender": "male", "height": "228"},
+            {"name": "Yoda", "gender": "male", "height": "66"},
+            {"name": "Beru Lars", "gender": "female", "height": "unknown"},
+        ]
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=crew):
+            by_height = await service.list_people(None, "height", Order.DESC)
+            males = await service.list_people(PeopleFilterDto(gender="male"), "height")
+            multi = await service.list_people(None, "gender,-height")
+            collection = await service.collections.get("people")
+
+        assert [p["name"] for p in by_height] == [
+            p["name"] for p in DataSorter.sort(crew, "height", Order.DESC)
+        ]
+        assert [p["name"] for p in males] == ["Yoda", "Luke Skywalker", "Chewbacca"]
+        # Como no DataSorter, valores desconhecidos ficam após os números
+        # na ordem crescente (e antes deles na decrescente)
+        assert [p["name"] for p in multi] == [
+            "Beru Lars",
+            "Leia Organa",
+            "Chewbacca",
+            "Luke Skywalker",
+            "Yoda",
+        ]
+        # Permutação montada uma vez e reaproveitada pelas consultas seguintes
+        assert collection.permutation("height") is collection.permutation("height")
+
+    @pytest.mark.asyncio
+    async def test_pagination_with_cursor_resolves_only_the_page(self):
+        fleet = [
+            {
+                "name": f"Ship {i}",
+                "cost_in_credits": str(i * 1000),
+                "pilots": [f"https://swapi.info/api/people/{i}"],
+                "url": f"https://swapi.info/api/starships/{i}",
+            }
+            for i in range(1, 8)
+        ]
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=fleet):
+            with patch(
+                "starwars_api.services.collection_store.resolve_name_fields_many",
+                side_effect=fake_resolve_many,
+            ) as resolve:
+                first = await service.list_starships(
+                    None, "cost_in_credits", Order.DESC, limit=3
+                )
+                second = await service.list_starships(
+                    None, "cost_in_credits", Order.DESC, cursor=first["next"]
+                )
+                resolved_rows = [
+                    row for call in resolve.await_args_list for row in call.args[0]
+                ]
+
+        assert first["count"] == 7
+        assert [s["name"] for s in first["results"]] == ["Ship 7", "Ship 6", "Ship 5"]
+        assert [s["name"] for s in second["results"]] == ["Ship 4", "Ship 3", "Ship 2"]
+        assert second["next"] is not None
+        # Nenhuma linha fora das páginas servidas passou pela resolução de nomes
+        assert sorted(row["name"] for row in resolved_rows) == [
+            "Ship 2",
+            "Ship 3",
+            "Ship 4",
+            "Ship 5",
+            "Ship 6",
+            "Ship 7",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_cursor_from_other_query_is_rejected(self, people):
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=people):
+            page = await service.list_people(None, "name", limit=1)
+            with pytest.raises(HTTPException) as exc_info:
+                await service.list_people(None, "height", cursor=page["next"])
+
+        assert exc_info.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_multi_key_top_k(self, people):
+        people.append({**people[0], "name": "Biggs", "url": "https://swapi.info/api/people/9"})
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=people):
+            with patch(
+                "starwars_api.services.collection_store.heapq.nsmallest",
+                wraps=heapq.nsmallest,
+            ) as nsmallest:
+                page = await service.list_people(None, "eye_color,name", limit=2)
+
+        nsmallest.assert_called_once()
+        assert [p["name"] for p in page["results"]] == ["Biggs", "Luke Skywalker"]
+
+    @pytest.mark.asyncio
+    async def test_projection_on_filtered_query(self, people):
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=people):
+            with patch(
+                "starwars_api.services.collection_store.resolve_name_fields_many",
+                side_effect=fake_resolve_many,
+            ) as resolve:
+                result = await service.list_people(
+                    PeopleFilterDto(eye_color="brown"), fields="name,homeworld"
+                )
+
+        assert result == [{"homeworld": "Naboo", "name": "Padmé Amidala"}]
+        assert resolve.await_args.args[1] == ["homeworld"]
+
+    @pytest.mark.asyncio
+    async def test_unresolved_references_are_retried(self, people):
+        service = SwapiService()
+        calls = []
+
+        async def flaky_resolve(items, fields):
+            # Primeira resolução falha (url_to_name devolve None), a segunda funciona
+            calls.append(len(items))
+            if len(calls) == 1:
+                for item in items:
+                    for field in fields:
+                        value = item.get(field)
+                        item[field] = [None] * len(value) if isinstance(value, list) else None
+                return items
+            return await fake_resolve_many(items, fields)
+
+        with patch.object(service, "_make_request", return_value=people):
+            with patch(
+                "starwars_api.services.collection_store.resolve_name_fields_many",
+                side_effect=flaky_resolve,
+            ):
+                first = await service.list_people(PeopleFilterDto(eye_color="blue"))
+                second = await service.list_people(PeopleFilterDto(eye_color="blue"))
+                third = await service.list_people(PeopleFilterDto(eye_color="blue"))
+
+        assert first[0]["homeworld"] is None
+        assert second[0]["homeworld"] == "Tatooine"
+        assert third[0]["homeworld"] == "Tatooine"
+        assert calls == [1, 1]
+
+    @pytest.mark.asyncio
+    async def test_expand_uses_entity_graph(self, people):
+        service = SwapiService()
+        planets = [
+            {"name": "Tatooine", "url": "https://swapi.info/api/planets/1"},
+            {"name": "Naboo", "url": "https://swapi.info/api/planets/8"},
+        ]
+
+        async def collection(endpoint, *args):
+            return {"people": people, "planets": planets}.get(endpoint, [])
+
+        with patch.object(service, "_make_request", side_effect=collection):
+            with patch(
+                "starwars_api.services.collection_store.resolve_name_fields_many"
+            ) as resolve:
+                result = await service.list_people(
+                    PeopleFilterDto(eye_color="blue"), expand="homeworld"
+                )
+
+        resolve.assert_not_called()
+        assert result[0]["homeworld"]["name"] == "Tatooine"
+        assert result[0]["films"] == [None]
+
+    @pytest.mark.asyncio
+    async def test_expand_skips_relations_dropped_by_projection(self, people):
+        service = SwapiService()
+        planets = [{"name": "Tatooine", "url": "https://swapi.info/api/planets/1"}]
+
+        async def collection(endpoint, *args):
+            return {"people": people, "planets": planets}.get(endpoint, [])
+
+        with patch.object(service, "_make_request", side_effect=collection):
+            with patch.object(
+                EntityGraph, "_expand_ref", autospec=True, side_effect=EntityGraph._expand_ref
+            ) as expand_ref:
+                result = await service.list_people(
+                    PeopleFilterDto(eye_color="blue"),
+                    expand="homeworld,films",
+                    fields="name,homeworld",
+                )
+
+        # films está no expand, mas fora do fields=: nem é expandido
+        assert [call.args[1] for call in expand_ref.call_args_list] == [
+            "https://swapi.info/api/planets/1"
+        ]
+        assert result == [{"homeworld": planets[0], "name": "Luke Skywalker"}]
+
+    @pytest.mark.asyncio
+    async def test_expand_rejects_deep_paths(self):
+        service = SwapiService()
+
+        with pytest.raises(HTTPException) as exc:
+            await service.list_people(expand="films.characters.homeworld.films")
+
+        assert exc.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_related_reads_reverse_index(self, people):
+        service = SwapiService()
+        planets = [
+            {
+                "name": "Tatooine",
+                "residents": [],
+                "films": [],
+                "url": "https://swapi.info/api/planets/1",
+            }
+        ]
+
+        async def collection(endpoint, *args):
+            return {"people": people, "planets": planets}.get(endpoint, [])
+
+        with patch.object(service, "_make_request", side_effect=collection):
+            residents = await service.list_related(
+                "planets", "1", "people", fields="name,homeworld"
+            )
+            with pytest.raises(HTTPException) as missing:
+                await service.list_related("planets", "99", "people")
+            with pytest.raises(HTTPException) as unknown:
+                await service.list_related("planets", "1", "droids")
+
+        # residents está vazio, mas homeworld de Luke aponta para o planeta
+        assert residents == [{"homeworld": "Tatooine", "name": "Luke Skywalker"}]
+        assert missing.value.status_code == 404
+        assert unknown.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_related_converts_swapi_errors(self):
+        service = SwapiService()
+        error = httpx.HTTPStatusError(
+            "Service Unavailable",
+            request=MagicMock(),
+            response=MagicMock(status_code=503),
+        )
+
+        with patch.object(service, "_make_request", side_effect=error):
+            with pytest.raises(HTTPException) as exc:
+                await service.list_related("planets", "1", "people")
+
+        assert exc.value.status_code == 503
+
+    @pytest.mark.asyncio
+    async def test_aggregate_by_relationship_cached_per_version(self, people):
+        service = SwapiService()
+        people = [
+            {**person, "height": height}
+            for person, height in zip(people, ["172", "165"])
+        ] + [{**people[0], "name": "Owen Lars", "height": "unknown"}]
+
+        with patch.object(service, "_make_request", return_value=people):
+            result = await service.aggregate(
+                "people", "homeworld", {"avg": "height", "max": "height"}
+            )
+            collection = await service.collections.get("people")
+            with patch(
+                "starwars_api.services.collection_store.aggregate_groups"
+            ) as aggregate_groups:
+                again = await service.aggregate(
+                    "people", "homeworld", {"avg": "height", "max": "height"}
+                )
+
+        aggregate_groups.assert_not_called()
+        assert again == result
+        assert len(collection._aggregates) == 1
+        assert result == [
+            {"homeworld": "Naboo", "count": 1, "avg_height": 165.0, "max_height": 165.0},
+            {"homeworld": "Tatooine", "count": 2, "avg_height": 172.0, "max_height": 172.0},
+        ]
+
+    @pytest.mark.asyncio
+    async def test_aggregate_cache_key_is_normalized_and_bounded(self, people):
+        service = SwapiService()
+        people = [{**person, "height": "172", "mass": "77"} for person in people]
+
+        with patch.object(service, "_make_request", return_value=people):
+            collection = await service.collections.get("people")
+            first = await service.aggregate("people", None, {"avg": "height,mass"})
+            # Mesmos campos em outra ordem e repetidos reaproveitam a entrada
+            again = await service.aggregate("people", None, {"avg": "mass,height,mass"})
+            assert again == first
+            assert len(collection._aggregates) == 1
+
+            with patch("starwars_api.services.collection_store.AGGREGATE_CACHE_SIZE", 2):
+                for field in ("height", "mass", "height,mass"):
+                    await service.aggregate("people", None, {"max": field})
+
+        assert len(collection._aggregates) == 2
+
+    @pytest.mark.asyncio
+    async def test_aggregate_rejects_non_numeric_fields(self, people):
+        service = SwapiService()
+
+        with patch.object(service, "_make_request", return_value=people):
+            with pytest.raises(HTTPException) as exc:
+                await service.aggregate("people", None, {"sum": "eye_color"})
+
+        assert exc.value.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_renamed_reference_is_resolved_again(self, people):
+        service = SwapiService()
+        service.collections.refresh_interval = 0
+        planets = [{"name": "Tatooine", "url": "https://swapi.info/api/planets/1"}]
+
+        async def collection(endpoint, *args):
+            return {"people": people, "planets": planets}.get(endpoint, [])
+
+        async def resolve_from_planets(items, fields):
+            # Nomes lidos da coleção de planetas atual, como o url_to_name faria
+            names = {planet["url"]: planet["name"] for planet in planets}
+            for item in items:
+                if "homeworld" in fields:
+                    item["homeworld"] = names.get(item["homeworld"])
+            return items
+
+        name_cache.set("https://swapi.info/api/planets/1", "Tatooine")
+        with patch.object(service, "_make_request", side_effect=collection):
+            with patch(
+                "starwars_api.services.collection_store.resolve_name_fields_many",
+                side_effect=resolve_from_planets,
+            ):
+                before = await service.list_people(sort_by="name")
+                planets = [{"name": "Tatoo I", "url": "https://swapi.info/api/planets/1"}]
+                after = await service.list_people(sort_by="name")
+                filtered = await service.list_people(PeopleFilterDto(homeworld="tatoo i"))
+
+        assert before[0]["homeworld"] == "Tatooine"
+        assert after[0]["homeworld"] == "Tatoo I"
+        assert [p["name"] for p in filtered] == ["Luke Skywalker"]
+        assert name_cache.get("https://swapi.info/api/planets/1") is None
+
+    @pytest.mark.asyncio
+    async def test_store_rebuilds_only_when_collection_changes(self, people):
+        loader = AsyncMock(return_value=people)
+        store = CollectionStore(loader, ENDPOINT_FIELDS_MAP, refresh_interval=0)
+
+        first = await store.get("people")
+        same = await store.get("people")
+        loader.return_value = people[:1]
+        changed = await store.get("people")
+
+        assert same is first
+        assert changed is not first
+        assert len(changed.items) == 1
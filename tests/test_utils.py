@@ -1,12 +1,38 @@
+import asyncio
 import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
+from starwars_api.cache.local_cache import LocalNameCache, name_cache
+from starwars_api.enums.match_enum import Match
 from starwars_api.enums.order_enum import Order
-from starwars_api.util.naming import url_to_name
-from starwars_api.util.resolve_name_fields import resolve_name_fields
-from starwars_api.util.sorting import DataSorter
+from starwars_api.util import aggregation
+from starwars_api.util.aggregation import aggregate_groups, parse_percentiles
+from starwars_api.util.entity_graph import (
+    EntityGraph,
+    expand_key,
+    parse_expand,
+    resource_id,
+)
+from starwars_api.util.filtering import DataFilter, filter_field
+from starwars_api.util.http_client import SwapiHttpClient
+from starwars_api.util.indexing import build_indexes, index_names, intersect
+from starwars_api.util.numeric import (
+    NUMERIC_FIELDS,
+    NumericColumn,
+    parse_number,
+    split_range_filters,
+)
+from starwars_api.util.pagination import decode_cursor, encode_cursor, page_window
+from starwars_api.util.naming import fetch_documents, url_to_name
+from starwars_api.util.single_flight import SingleFlight
+from starwars_api.util.resolve_name_fields import (
+    collect_urls,
+    resolve_name_fields,
+    resolve_name_fields_many,
+)
+from starwars_api.util.sorting import DataSorter, parse_sort_keys
 
 
 class TestUrlToName:
@@ -160,6 +186,236 @@ class TestUrlToName:
         assert mock_client.get.call_count == 2
 
 
+class TestUrlToNameBatch:
+    @pytest.fixture
+    def mock_client(self):
+        return AsyncMock()
+
+    @pytest.mark.asyncio
+    async def test_url_to_name_uses_constant_round_trips(self, mock_client):
+        urls = [
+            "https://swapi.info/api/people/1",
+            "https://swapi.info/api/films/1",
+            "https://swapi.info/api/planets/1",
+        ]
+        mock_client.get.return_value = MagicMock(
+            status_code=200, json=lambda: {"name": "Tatooine"}
+        )
+
+        mock_cache = AsyncMock()
+        mock_cache.get_many.side_effect = [
+            ["Luke Skywalker", None, None],
+            [{"title": "A New Hope"}, None],
+        ]
+
+        with patch("starwars_api.util.naming.redis_cache", mock_cache):
+            with patch("starwars_api.util.naming.http_client", mock_client):
+                result = await url_to_name(urls)
+
+        assert result == ["Luke Skywalker", "A New Hope", "Tatooine"]
+        assert mock_cache.get_many.call_count == 2
+        mock_cache.get_many.assert_called_with(urls[1:])
+        mock_cache.set_many.assert_called_once()
+        written = mock_cache.set_many.call_args.args[0]
+        assert written["name:https://swapi.info/api/films/1"] == "A New Hope"
+        assert written["name:https://swapi.info/api/planets/1"] == "Tatooine"
+        assert written["https://swapi.info/api/planets/1"] == {"name": "Tatooine"}
+        mock_client.get.assert_called_once_with(urls[2])
+
+    @pytest.mark.asyncio
+    async def test_url_to_name_deduplicates_urls(self, mock_client):
+        urls = ["https://swapi.info/api/films/1"] * 3
+        mock_cache = AsyncMock()
+        mock_cache.get_many.side_effect = [["A New Hope"], []]
+
+        with patch("starwars_api.util.naming.redis_cache", mock_cache):
+            result = await url_to_name(urls)
+
+        assert result == ["A New Hope"] * 3
+        mock_cache.get_many.assert_any_call(["name:https://swapi.info/api/films/1"])
+
+
+class TestFetchDocuments:
+    @staticmethod
+    def _client(get):
+        client = AsyncMock()
+        client.get.side_effect = get
+        return client
+
+    @pytest.mark.asyncio
+    async def test_fetch_documents_respects_concurrency_cap(self):
+        in_flight = 0
+        peak = 0
+
+        async def get(url):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return MagicMock(status_code=200, json=lambda: {"name": url})
+
+        urls = [f"https://swapi.info/api/people/{i}" for i in range(10)]
+        with patch("starwars_api.util.naming.http_client", self._client(get)):
+            result = await fetch_documents(urls, concurrency=3)
+
+        assert [doc["name"] for doc in result] == urls
+        assert peak == 3
+
+    @pytest.mark.asyncio
+    async def test_fetch_documents_deadline_maps_slow_urls_to_none(self):
+        async def get(url):
+            if url.endswith("/2"):
+                await asyncio.sleep(10)
+            if url.endswith("/3"):
+                return MagicMock(status_code=404)
+            return MagicMock(status_code=200, json=lambda: {"name": url})
+
+        urls = [f"https://swapi.info/api/people/{i}" for i in range(1, 5)]
+        with patch("starwars_api.util.naming.http_client", self._client(get)):
+            result = await fetch_documents(urls, concurrency=4, deadline=0.1)
+
+        assert result[0] == {"name": urls[0]}
+        assert result[1] is None
+        assert result[2] is None
+        assert result[3] == {"name": urls[3]}
+
+
+class TestSingleFlight:
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        flights = SingleFlight()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "Tatooine"
+
+        results = await asyncio.gather(*[flights.do("k", compute) for _ in range(10)])
+
+        assert results == ["Tatooine"] * 10
+        assert calls == 1
+        assert flights.in_flight() == 0
+
+    @pytest.mark.asyncio
+    async def test_errors_are_shared_and_not_cached(self):
+        flights = SingleFlight()
+        compute = AsyncMock(side_effect=[RuntimeError("boom"), "ok"])
+
+        with pytest.raises(RuntimeError):
+            await flights.do("k", compute)
+
+        assert await flights.do("k", compute) == "ok"
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_shared_call(self):
+        flights = SingleFlight()
+
+        async def compute():
+            await asyncio.sleep(0.05)
+            return "done"
+
+        first = asyncio.create_task(flights.do("k", compute))
+        second = asyncio.create_task(flights.do("k", compute))
+        await asyncio.sleep(0)
+        first.cancel()
+
+        assert await second == "done"
+
+    @pytest.mark.asyncio
+    async def test_fetch_documents_coalesces_same_url_across_batches(self):
+        client = AsyncMock()
+
+        async def get(url):
+            await asyncio.sleep(0.01)
+            return MagicMock(status_code=200, json=lambda: {"name": "Tatooine"})
+
+        client.get.side_effect = get
+        url = "https://swapi.info/api/planets/1"
+        with patch("starwars_api.util.naming.http_client", client):
+            results = await asyncio.gather(
+                fetch_documents([url]), fetch_documents([url])
+            )
+
+        assert results == [[{"name": "Tatooine"}], [{"name": "Tatooine"}]]
+        client.get.assert_called_once_with(url)
+
+
+class TestSwapiHttpClient:
+    @pytest.mark.asyncio
+    async def test_client_is_reused_between_calls(self):
+        client = SwapiHttpClient(http2=False)
+
+        first = client.client
+        assert client.client is first
+        assert first.timeout.read == client.timeout
+
+        await client.close()
+        assert client.client is not first
+        await client.close()
+
+    def test_http2_requires_optional_dependency(self):
+        with patch(
+            "starwars_api.util.http_client._http2_available", return_value=False
+        ):
+            client = SwapiHttpClient(http2=True)
+
+        assert client.http2 is False
+
+
+class TestLocalNameCache:
+    def test_get_set_counts_hits_and_misses(self):
+        cache = LocalNameCache(max_size=10, ttl=60)
+        cache.set("https://swapi.info/api/planets/1", "Tatooine")
+
+        assert cache.get("https://swapi.info/api/planets/1") == "Tatooine"
+        assert cache.get("https://swapi.info/api/planets/2") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_evicts_least_recently_used(self):
+        cache = LocalNameCache(max_size=2, ttl=60)
+        cache.set("a", "A")
+        cache.set("b", "B")
+        cache.get("a")
+        cache.set("c", "C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == "A"
+        assert cache.get("c") == "C"
+
+    def test_expired_entries_are_misses(self):
+        cache = LocalNameCache(max_size=10, ttl=-1)
+        cache.set("a", "A")
+
+        assert cache.get("a") is None
+        assert cache.stats()["size"] == 0
+
+    @pytest.mark.asyncio
+    async def test_url_to_name_served_from_local_cache(self):
+        name_cache.set("https://swapi.info/api/planets/1", "Tatooine")
+
+        mock_cache = AsyncMock()
+
+        with patch("starwars_api.util.naming.redis_cache", mock_cache):
+            result = await url_to_name(["https://swapi.info/api/planets/1"])
+
+        assert result == ["Tatooine"]
+        mock_cache.get_many.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_url_to_name_fills_local_cache_from_redis(self):
+        mock_cache = AsyncMock()
+        mock_cache.get_many.side_effect = [["Tatooine"], []]
+
+        with patch("starwars_api.util.naming.redis_cache", mock_cache):
+            await url_to_name(["https://swapi.info/api/planets/1"])
+
+        assert name_cache.get("https://swapi.info/api/planets/1") == "Tatooine"
+
+
 class TestDataSorter:
     def test_sort_ascending(self):
         data = [
@@ -203,6 +459,25 @@ class TestDataSorter:
         assert result[1]["name"] == "C-3PO"
         assert result[2]["name"] == "Luke Skywalker"
 
+    def test_sort_numbers_with_thousands_separator_and_unknown(self):
+        data = [
+            {"name": "Tatooine", "diameter": "10465"},
+            {"name": "Yavin IV", "diameter": "unknown"},
+            {"name": "Hoth", "diameter": "7,200"},
+        ]
+
+        result = DataSorter.sort(data, "diameter", Order.ASC)
+
+        assert [p["name"] for p in result] == ["Hoth", "Tatooine", "Yavin IV"]
+
+    def test_parse_sort_keys(self):
+        assert parse_sort_keys("gender, -height") == [
+            ("gender", False),
+            ("height", True),
+        ]
+        assert parse_sort_keys("-height", Order.DESC) == [("height", False)]
+        assert parse_sort_keys(None) == []
+
     def test_sort_missing_field(self):
         data = [{"name": "C-3PO"}, {"name": "Luke Skywalker"}]
 
@@ -302,3 +577,428 @@ class TestResolveNameFields:
         result = await resolve_name_fields(item, fields_to_resolve)
 
         assert result == item
+
+
+class TestResolveNameFieldsMany:
+    @pytest.fixture
+    def people(self):
+        return [
+            {
+                "name": "Luke Skywalker",
+                "homeworld": "https://swapi.info/api/planets/1",
+                "films": [
+                    "https://swapi.info/api/films/1",
+                    "https://swapi.info/api/films/2",
+                ],
+            },
+            {
+                "name": "C-3PO",
+                "homeworld": "https://swapi.info/api/planets/1",
+                "films": ["https://swapi.info/api/films/1"],
+            },
+        ]
+
+    def test_collect_urls_unique_across_items(self, people):
+        urls = collect_urls(people, ["homeworld", "films"])
+
+        assert urls == [
+            "https://swapi.info/api/planets/1",
+            "https://swapi.info/api/films/1",
+            "https://swapi.info/api/films/2",
+        ]
+
+    @pytest.mark.asyncio
+    async def test_resolve_name_fields_many_single_lookup(self, people):
+        with patch(
+            "starwars_api.util.resolve_name_fields.url_to_name"
+        ) as mock_url_to_name:
+            mock_url_to_name.return_value = [
+                "Tatooine",
+                "A New Hope",
+                "The Empire Strikes Back",
+            ]
+
+            result = await resolve_name_fields_many(people, ["homeworld", "films"])
+
+        mock_url_to_name.assert_called_once()
+        assert result[0]["homeworld"] == "Tatooine"
+        assert result[0]["films"] == ["A New Hope", "The Empire Strikes Back"]
+        assert result[1]["homeworld"] == "Tatooine"
+        assert result[1]["films"] == ["A New Hope"]
+
+    @pytest.mark.asyncio
+    async def test_resolve_name_fields_many_without_urls(self):
+        items = [{"name": "Luke Skywalker", "films": []}]
+
+        with patch(
+            "starwars_api.util.resolve_name_fields.url_to_name"
+        ) as mock_url_to_name:
+            result = await resolve_name_fields_many(items, ["films"])
+
+        mock_url_to_name.assert_not_called()
+        assert result == items
+
+
+class TestEntityGraph:
+    @pytest.fixture
+    def graph(self):
+        return EntityGraph(
+            {
+                "films": [
+                    {"title": "A New Hope", "url": "https://swapi.info/api/films/1"}
+                ],
+                "planets": [
+                    {"name": "Tatooine", "url": "https://swapi.info/api/planets/1"}
+                ],
+            }
+        )
+
+    def test_names_use_name_or_title(self, graph):
+        assert graph.names() == {
+            "https://swapi.info/api/films/1": "A New Hope",
+            "https://swapi.info/api/planets/1": "Tatooine",
+        }
+
+    def test_resolve_matches_resolve_name_fields(self, graph):
+        item = {
+            "name": "Luke Skywalker",
+            "homeworld": "https://swapi.info/api/planets/1",
+            "films": [
+                "https://swapi.info/api/films/1",
+                "https://swapi.info/api/films/9",
+            ],
+            "species": [],
+        }
+
+        result = graph.resolve(item, ["homeworld", "films", "species"])
+
+        assert result["homeworld"] == "Tatooine"
+        # URL fora do grafo vira None, como em url_to_name
+        assert result["films"] == ["A New Hope", None]
+        assert result["species"] == []
+        assert item["homeworld"] == "https://swapi.info/api/planets/1"
+
+    def test_resource_id(self):
+        assert resource_id("https://swapi.info/api/people/12") == "12"
+        assert resource_id("https://swapi.dev/api/people/12/") == "12"
+
+    def test_parse_expand_builds_tree_and_limits_depth(self):
+        tree = parse_expand("films.planets, homeworld,films")
+
+        assert tree == {"films": {"planets": {}}, "homeworld": {}}
+        assert expand_key(tree) == "films.planets,homeworld"
+        assert parse_expand(None) == {}
+        with pytest.raises(ValueError):
+            parse_expand("films.characters.homeworld", max_depth=2)
+
+    def test_expand_inlines_entities_from_graph(self):
+        graph = EntityGraph(
+            {
+                "people": [
+                    {
+                        "name": "Luke Skywalker",
+                        "homeworld": "https://swapi.info/api/planets/1",
+                        "films": ["https://swapi.info/api/films/1"],
+                        "url": "https://swapi.info/api/people/1",
+                    }
+                ],
+                "films": [
+                    {
+                        "title": "A New Hope",
+                        "planets": ["https://swapi.info/api/planets/1"],
+                        "characters": ["https://swapi.info/api/people/1"],
+                        "url": "https://swapi.info/api/films/1",
+                    }
+                ],
+                "planets": [
+                    {"name": "Tatooine", "url": "https://swapi.info/api/planets/1"}
+                ],
+            }
+        )
+        fields_map = {
+            "people": ["homeworld", "films"],
+            "films": ["planets", "characters"],
+            "planets": [],
+        }
+        luke = graph.entities["https://swapi.info/api/people/1"]
+
+        result = graph.expand(luke, parse_expand("films.planets"), fields_map)
+
+        # Só o caminho pedido é expandido; o resto continua como nome
+        assert result["homeworld"] == "Tatooine"
+        film = result["films"][0]
+        assert film["title"] == "A New Hope"
+        assert film["planets"][0]["name"] == "Tatooine"
+        assert film["characters"] == ["Luke Skywalker"]
+
+
+class TestRelationIndex:
+    @pytest.fixture
+    def graph(self):
+        return EntityGraph(
+            {
+                "people": [
+                    {
+                        "name": "Luke Skywalker",
+                        "starships": ["https://swapi.info/api/starships/12"],
+                        "url": "https://swapi.info/api/people/1",
+                    },
+                    {
+                        "name": "Wedge Antilles",
+                        "starships": ["https://swapi.info/api/starships/12"],
+                        "url": "https://swapi.info/api/people/18",
+                    },
+                ],
+                "starships": [
+                    {
+                        "name": "X-wing",
+                        "films": ["https://swapi.info/api/films/1"],
+                        "url": "https://swapi.info/api/starships/12",
+                    }
+                ],
+                "films": [
+                    {
+                        "title": "A New Hope",
+                        "characters": ["https://swapi.info/api/people/18"],
+                        "url": "https://swapi.info/api/films/1",
+                    }
+                ],
+            }
+        )
+
+    def test_links_are_indexed_in_both_directions(self, graph):
+        starship = graph.url_for("starships", "12")
+
+        # Os pilotos só apontam para a nave; o índice guarda o caminho de volta
+        assert graph.related(starship, ["people"]) == [
+            "https://swapi.info/api/people/1",
+            "https://swapi.info/api/people/18",
+        ]
+        assert graph.related("https://swapi.info/api/films/1", ["starships"]) == [
+            starship
+        ]
+
+    def test_multi_hop_path(self, graph):
+        starship = graph.url_for("starships", "12")
+
+        assert graph.related(starship, ["films", "people"]) == [
+            "https://swapi.info/api/people/18"
+        ]
+        assert graph.related(starship, ["planets"]) == []
+
+
+class TestAggregation:
+    @pytest.fixture
+    def data(self):
+        keys = ["Human", "Droid", "Human", "Human", "Droid"]
+        columns = {"height": [172.0, 96.0, None, 188.0, 167.0]}
+        return keys, columns
+
+    def test_group_metrics(self, data):
+        keys, columns = data
+        metrics = {"avg": ["height"], "min": ["height"], "percentile": ["height"]}
+
+        with patch.object(aggregation, "np", None):
+            result = aggregate_groups(keys, columns, metrics, (50.0,), label="species")
+
+        # Valores desconhecidos contam no grupo, mas ficam fora das métricas
+        assert result == [
+            {
+                "species": "Droid",
+                "count": 2,
+                "avg_height": 131.5,
+                "min_height": 96.0,
+                "p50_height": 131.5,
+            },
+            {
+                "species": "Human",
+                "count": 3,
+                "avg_height": 180.0,
+                "min_height": 172.0,
+                "p50_height": 180.0,
+            },
+        ]
+
+    def test_group_without_known_values(self):
+        with patch.object(aggregation, "np", None):
+            result = aggregate_groups(
+                ["a"], {"mass": [None]}, {"sum": ["mass"], "max": ["mass"]}
+            )
+
+        # Só unknown no grupo: nem a soma é reportada como 0
+        assert result == [{"group": "a", "count": 1, "sum_mass": None, "max_mass": None}]
+
+    @pytest.mark.skipif(aggregation.np is None, reason="numpy não instalado")
+    def test_numpy_matches_pure_python(self, data):
+        keys, columns = data
+        # Grupo só com valores desconhecidos
+        keys, columns = keys + ["Ewok"], {"height": columns["height"] + [None]}
+        metrics = {name: ["height"] for name in aggregation.AGGREGATIONS}
+
+        vectorized = aggregate_groups(keys, columns, metrics, (25.0, 90.0))
+        with patch.object(aggregation, "np", None):
+            fallback = aggregate_groups(keys, columns, metrics, (25.0, 90.0))
+
+        assert vectorized == pytest.approx(fallback)
+
+    @pytest.mark.skipif(aggregation.np is None, reason="numpy não instalado")
+    def test_numpy_group_without_known_values(self):
+        metrics = {name: ["mass"] for name in aggregation.AGGREGATIONS}
+
+        result = aggregate_groups(["a", "b"], {"mass": [None, 80.0]}, metrics)
+
+        # Mesmo contrato do caminho puro: todas as métricas viram None
+        assert result[0] == {
+            "group": "a",
+            "count": 1,
+            "sum_mass": None,
+            "avg_mass": None,
+            "min_mass": None,
+            "max_mass": None,
+            "p50_mass": None,
+        }
+        assert result[1]["p50_mass"] == 80.0
+
+    def test_parse_percentiles(self):
+        assert parse_percentiles(None) == (50.0,)
+        assert parse_percentiles("90, 25,90") == (25.0, 90.0)
+        with pytest.raises(ValueError):
+            parse_percentiles("101")
+
+
+class TestDataFilter:
+    @pytest.fixture
+    def starship(self):
+        item = {
+            "name": "X-wing",
+            "starship_class": "Starfighter",
+            "pilots": [
+                "https://swapi.info/api/people/1",
+                "https://swapi.info/api/people/9",
+            ],
+        }
+        resolved = {**item, "pilots": ["Luke Skywalker", "Biggs Darklighter"]}
+        return item, resolved
+
+    def test_scalar_match_modes(self, starship):
+        item, resolved = starship
+
+        assert DataFilter.matches(item, resolved, "starship_class", "starfighter", [])
+        assert not DataFilter.matches(
+            item, resolved, "starship_class", "starfighter", [], Match.EXACT
+        )
+        assert DataFilter.matches(
+            item, resolved, "starship_class", "fight", [], Match.CONTAINS
+        )
+
+    def test_relationship_accepts_name_id_or_url(self, starship):
+        item, resolved = starship
+        relations = ["pilots"]
+
+        assert DataFilter.matches(item, resolved, "pilots", "luke skywalker", relations)
+        assert DataFilter.matches(item, resolved, "pilots", "1, 9", relations)
+        assert DataFilter.matches(
+            item, resolved, "pilots", "https://swapi.info/api/people/9", relations
+        )
+        assert not DataFilter.matches(item, resolved, "pilots", "1,2", relations)
+
+    def test_dto_array_aliases(self):
+        assert filter_field("film") == "films"
+        assert filter_field("species") == "species"
+
+
+class TestFieldIndexes:
+    @pytest.fixture
+    def indexes(self):
+        a_new_hope = "https://swapi.info/api/films/1"
+        empire = "https://swapi.info/api/films/2"
+        items = [
+            {"name": "Luke Skywalker", "gender": "male", "films": [a_new_hope]},
+            {"name": "Leia Organa", "gender": "female", "films": [a_new_hope, empire]},
+            {"name": "Han Solo", "gender": "male", "films": [empire]},
+        ]
+        resolved = [
+            {**items[0], "films": ["A New Hope"]},
+            {**items[1], "films": ["A New Hope", "The Empire Strikes Back"]},
+            {**items[2], "films": ["The Empire Strikes Back"]},
+        ]
+        indexes = build_indexes(items, ["films"])
+        index_names(indexes, resolved)
+        return indexes
+
+    def test_posting_lists(self, indexes):
+        assert indexes["gender"].terms == {"male": [0, 2], "female": [1]}
+        assert indexes["films"].refs["2"] == [1, 2]
+
+    def test_candidates_and_intersection(self, indexes):
+        male = indexes["gender"].candidates("Male")
+        empire = indexes["films"].candidates("the empire strikes back")
+        both_films = indexes["films"].candidates("1,2")
+
+        assert intersect([male, empire]) == {2}
+        assert both_films == {1}
+        assert indexes["name"].candidates("sol", Match.CONTAINS) == {2}
+
+    def test_intersect_empty(self):
+        assert intersect([]) == set()
+        assert intersect([[1, 2], []]) == set()
+
+
+class TestNumericColumns:
+    def test_parse_number(self):
+        assert parse_number("1,000") == 1000.0
+        assert parse_number("1.5") == 1.5
+        assert parse_number(4) == 4.0
+        assert parse_number("unknown") is None
+        assert parse_number("n/a") is None
+        assert parse_number("30-165") is None
+        assert parse_number("Infinity") is None
+
+    def test_range_uses_sorted_column(self):
+        column = NumericColumn.from_items(
+            "mass",
+            [{"mass": "77"}, {"mass": "1,358"}, {"mass": "unknown"}, {"mass": "32"}],
+        )
+
+        assert column.sorted_positions == [3, 0, 1]
+        assert column.unknown == 1
+        assert column.range(40, None) == {0, 1}
+        assert column.range(None, 77) == {0, 3}
+        assert column.range(100, 50) == set()
+
+    def test_split_range_filters(self):
+        ranges, others = split_range_filters(
+            {"min_height": 100, "max_height": 200, "max_mass": 80, "gender": "male"},
+            ["height", "mass"],
+        )
+
+        assert ranges == {"height": (100, 200), "mass": (None, 80)}
+        assert others == {"gender": "male"}
+
+    def test_max_prefixed_field_is_not_a_range(self):
+        fields = NUMERIC_FIELDS["starships"]
+
+        ranges, others = split_range_filters(
+            {"max_atmosphering_speed": "1050", "min_max_atmosphering_speed": 1000},
+            fields,
+        )
+
+        # max_atmosphering_speed é o próprio campo, não o teto de "atmosphering_speed"
+        assert others == {"max_atmosphering_speed": "1050"}
+        assert ranges == {"max_atmosphering_speed": (1000, None)}
+
+
+class TestPagination:
+    def test_cursor_round_trip(self):
+        cursor = encode_cursor(20, 10, "q1")
+
+        assert "=" not in cursor
+        assert decode_cursor(cursor, "q1") == (20, 10)
+        assert page_window(cursor=cursor, query="q1") == (20, 10)
+        assert page_window(limit=5, cursor=cursor, query="q1") == (20, 5)
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError):
+            decode_cursor("not-a-cursor", "q1")
+        with pytest.raises(ValueError):
+            decode_cursor(encode_cursor(20, 10, "q1"), "q2")
@@ -0,0 +1,519 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+
+from starwars_api.cache.codec import loads_json
+from starwars_api.cache.local_cache import name_cache
+from starwars_api.cache.ttl import PROCESSED_HARD_TTL, PROCESSED_TTL_JITTER
+from starwars_api.cache.warmup_jobs import (
+    CURRENT_JOB_KEY,
+    WarmupAlreadyRunning,
+    WarmupJobManager,
+    job_progress,
+)
+from starwars_api.cache.warmup_service import (
+    FINGERPRINTS_KEY,
+    CacheWarmupService,
+    fingerprint,
+)
+from starwars_api.util.rate_limiter import TokenBucket
+
+
+def _response(payload):
+    response = MagicMock()
+    response.raise_for_status.return_value = None
+    response.json.return_value = payload
+    return response
+
+
+class TestTokenBucket:
+    @pytest.mark.asyncio
+    async def test_burst_up_to_capacity_then_throttles(self):
+        bucket = TokenBucket(rate=50, capacity=5)
+
+        started = time.monotonic()
+        for _ in range(10):
+            await bucket.acquire()
+        elapsed = time.monotonic() - started
+
+        # 5 tokens imediatos + 5 a 50/s = ~0.1s
+        assert 0.08 <= elapsed < 0.5
+
+    def test_rate_must_be_positive(self):
+        with pytest.raises(ValueError):
+            TokenBucket(rate=0)
+
+
+class TestCacheWarmupService:
+    @pytest.fixture
+    def warmup(self):
+        redis = AsyncMock()
+        redis.expire_many.return_value = []
+        return CacheWarmupService(
+            redis_cache=redis,
+            endpoints=["films", "people"],
+            requests_per_second=1000,
+        )
+
+    @pytest.mark.asyncio
+    async def test_fetch_all_pages_full_collection(self, warmup):
+        client = AsyncMock()
+        client.get.return_value = _response([{"title": "A New Hope"}])
+
+        with patch("starwars_api.cache.warmup_service.http_client", client):
+            items = await warmup._fetch_all_pages("films")
+
+        assert items == [{"title": "A New Hope"}]
+        client.get.assert_called_once_with("https://swapi.info/api/films")
+
+    @pytest.mark.asyncio
+    async def test_fetch_all_pages_paginated_in_parallel(self, warmup):
+        pages = {
+            "https://swapi.info/api/people": {
+                "count": 5,
+                "next": "https://swapi.info/api/people?page=2",
+                "results": [{"name": "Luke"}, {"name": "C-3PO"}],
+            },
+            "https://swapi.info/api/people?page=2": {
+                "results": [{"name": "R2-D2"}, {"name": "Darth Vader"}]
+            },
+            "https://swapi.info/api/people?page=3": {"results": [{"name": "Leia"}]},
+        }
+        client = AsyncMock()
+        client.get.side_effect = lambda url: _response(pages[url])
+
+        with patch("starwars_api.cache.warmup_service.http_client", client):
+            items = await warmup._fetch_all_pages("people")
+
+        assert [item["name"] for item in items] == [
+            "Luke",
+            "C-3PO",
+            "R2-D2",
+            "Darth Vader",
+            "Leia",
+        ]
+        assert client.get.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_warm_all_runs_endpoints_concurrently(self, warmup):
+        in_flight = 0
+        peak = 0
+
+        async def fetch(endpoint):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return [{"url": f"https://swapi.info/api/{endpoint}/1"}]
+
+        with patch.object(warmup, "_fetch_all_pages", side_effect=fetch):
+            report = await warmup.warm_all()
+
+        assert peak == 2
+        assert report["total_items"] == 2
+        assert report["total_cached"] == 2
+        assert "duration_seconds" in report
+        assert all("duration_seconds" in detail for detail in report["details"])
+
+    @pytest.mark.asyncio
+    async def test_warm_all_writes_processed_views_from_graph(self, warmup):
+        collections = {
+            "films": [
+                {
+                    "title": "A New Hope",
+                    "url": "https://swapi.info/api/films/1",
+                    "characters": ["https://swapi.info/api/people/1"],
+                    "planets": [],
+                    "starships": [],
+                    "vehicles": [],
+                    "species": [],
+                }
+            ],
+            "people": [
+                {
+                    "name": "Luke Skywalker",
+                    "url": "https://swapi.info/api/people/1",
+                    "homeworld": "https://swapi.info/api/planets/1",
+                    "films": ["https://swapi.info/api/films/1"],
+                    "species": [],
+                    "starships": [],
+                    "vehicles": [],
+                }
+            ],
+        }
+
+        async def fetch(endpoint):
+            return collections[endpoint]
+
+        with patch.object(warmup, "_fetch_all_pages", side_effect=fetch) as fetch_mock:
+            report = await warmup.warm_all()
+
+        # Nenhuma requisição além de uma por coleção
+        assert fetch_mock.call_count == 2
+        assert report["status"] == "completed"
+
+        raw_call, processed_call = warmup.redis.set_many.await_args_list
+        raw = raw_call.args[0]
+        assert raw["name:https://swapi.info/api/people/1"] == "Luke Skywalker"
+        assert raw["https://swapi.info/api/films/1"] == collections["films"][0]
+        assert raw["people:1"] == collections["people"][0]
+        assert raw["people"] == collections["people"]
+
+        processed = processed_call.args[0]
+        assert processed_call.kwargs == {
+            "expire": PROCESSED_HARD_TTL,
+            "jitter": PROCESSED_TTL_JITTER,
+        }
+        person = loads_json(processed["people_1_processed"])
+        # Planeta fora do grafo não gera busca extra: vira None
+        assert person["homeworld"] is None
+        assert person["films"] == ["A New Hope"]
+        films = loads_json(processed["films_processed"])
+        assert films[0]["characters"] == ["Luke Skywalker"]
+
+        assert name_cache.get("https://swapi.info/api/films/1") == "A New Hope"
+
+    @pytest.mark.asyncio
+    async def test_fetch_error_propagates(self, warmup):
+        client = AsyncMock()
+        client.get.side_effect = httpx.ConnectError("boom")
+
+        with patch("starwars_api.cache.warmup_service.http_client", client):
+            with pytest.raises(httpx.ConnectError):
+                await warmup._fetch_all_pages("films")
+
+    @pytest.mark.asyncio
+    async def test_failed_collection_skips_dependent_views(self, warmup):
+        films = [
+            {
+                "title": "A New Hope",
+                "url": "https://swapi.info/api/films/1",
+                "characters": ["https://swapi.info/api/people/1"],
+                "planets": [],
+                "starships": [],
+                "vehicles": [],
+                "species": [],
+            },
+            {
+                "title": "Sem elenco",
+                "url": "https://swapi.info/api/films/9",
+                "characters": [],
+                "planets": [],
+                "starships": [],
+                "vehicles": [],
+                "species": [],
+            },
+        ]
+
+        async def fetch(endpoint):
+            if endpoint == "people":
+                raise httpx.ConnectError("boom")
+            return films
+
+        with patch.object(warmup, "_fetch_all_pages", side_effect=fetch):
+            report = await warmup.warm_all()
+
+        assert report["status"] == "partial"
+        assert report["failed_endpoints"] == ["people"]
+
+        raw_call, processed_call = warmup.redis.set_many.await_args_list
+        raw, processed = raw_call.args[0], processed_call.args[0]
+        # Nada da coleção que falhou é gravado, nem views que citam pessoas
+        assert "people" not in raw
+        assert raw["films"] == films
+        assert "people_processed" not in processed
+        assert "films_processed" not in processed
+        assert "films_1_processed" not in processed
+        assert "films_9_processed" in processed
+        warmup.redis.set.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_incremental_rewrites_only_changed_entities(self, warmup):
+        tatooine = {
+            "name": "Tatooine",
+            "url": "https://swapi.info/api/planets/1",
+            "residents": [],
+            "films": [],
+            "edited": "2014-12-20T20:58:18.411000Z",
+        }
+        alderaan = {
+            "name": "Alderaan",
+            "url": "https://swapi.info/api/planets/2",
+            "residents": [],
+            "films": [],
+            "edited": "2014-12-20T20:58:18.420000Z",
+        }
+        luke = {
+            "name": "Luke Skywalker",
+            "url": "https://swapi.info/api/people/1",
+            "homeworld": "https://swapi.info/api/planets/1",
+            "films": [],
+            "species": [],
+            "starships": [],
+            "vehicles": [],
+        }
+        leia = {
+            "name": "Leia Organa",
+            "url": "https://swapi.info/api/people/5",
+            "homeworld": "https://swapi.info/api/planets/2",
+            "films": [],
+            "species": [],
+            "starships": [],
+            "vehicles": [],
+        }
+        warmup.endpoints = ["planets", "people"]
+        previous = {
+            entity["url"]: fingerprint(entity)
+            for entity in (tatooine, alderaan, luke, leia)
+        }
+        previous["https://swapi.info/api/planets/9"] = "removido"
+        warmup.redis.get.return_value = previous
+
+        renamed = {**tatooine, "name": "Tatooine II", "edited": "2024-01-01T00:00:00Z"}
+        collections = {"planets": [renamed, alderaan], "people": [luke, leia]}
+
+        async def fetch(endpoint):
+            return collections[endpoint]
+
+        with patch.object(warmup, "_fetch_all_pages", side_effect=fetch):
+            report = await warmup.warm_all(incremental=True)
+
+        assert report["mode"] == "incremental"
+        assert report["changed_items"] == 1
+        assert report["removed_items"] == 1
+
+        raw_call, processed_call = warmup.redis.set_many.await_args_list
+        raw = raw_call.args[0]
+        assert raw["name:https://swapi.info/api/planets/1"] == "Tatooine II"
+        assert "name:https://swapi.info/api/planets/2" not in raw
+        assert "people:1" not in raw
+        assert "people" not in raw
+        assert raw["planets"] == [renamed, alderaan]
+
+        processed = processed_call.args[0]
+        # Luke cita Tatooine e é re-resolvido; Leia não muda
+        assert loads_json(processed["people_1_processed"])["homeworld"] == "Tatooine II"
+        assert "people_5_processed" not in processed
+        assert "people_processed" in processed
+
+        touched = [
+            key
+            for call in warmup.redis.expire_many.await_args_list
+            for key in call.args[0]
+        ]
+        assert "people_5_processed" in touched
+        assert "name:https://swapi.info/api/planets/2" in touched
+        warmup.redis.delete.assert_awaited_once()
+        assert "planets_9_processed" in warmup.redis.delete.await_args.args
+
+        warmup.redis.set.assert_awaited_once()
+        assert warmup.redis.set.await_args.args[0] == FINGERPRINTS_KEY
+
+
+    @pytest.fixture
+    def planets_and_people(self):
+        tatooine = {
+            "name": "Tatooine",
+            "url": "https://swapi.info/api/planets/1",
+            "residents": [],
+            "films": [],
+        }
+        luke = {
+            "name": "Luke Skywalker",
+            "url": "https://swapi.info/api/people/1",
+            "homeworld": "https://swapi.info/api/planets/1",
+            "films": [],
+            "species": [],
+            "starships": [],
+            "vehicles": [],
+        }
+        return {"planets": [tatooine], "people": [luke]}
+
+    @pytest.mark.asyncio
+    async def test_incremental_failed_fetch_removes_nothing(
+        self, warmup, planets_and_people
+    ):
+        warmup.endpoints = ["planets", "people"]
+        warmup.redis.get.return_value = {
+            entity["url"]: fingerprint(entity)
+            for items in planets_and_people.values()
+            for entity in items
+        }
+
+        async def fetch(endpoint):
+            if endpoint == "people":
+                raise httpx.ConnectError("boom")
+            return planets_and_people[endpoint]
+
+        with patch.object(warmup, "_fetch_all_pages", side_effect=fetch):
+            report = await warmup.warm_all(incremental=True)
+
+        assert report["status"] == "partial"
+        assert report["removed_items"] == 0
+        deleted = warmup.redis.delete.await_args.args
+        assert not any("people" in key for key in deleted)
+
+    @pytest.mark.asyncio
+    async def test_incremental_rewrites_expired_keys(self, warmup, planets_and_people):
+        warmup.endpoints = ["planets", "people"]
+        warmup.redis.get.return_value = {
+            entity["url"]: fingerprint(entity)
+            for items in planets_and_people.values()
+            for entity in items
+        }
+        # Nada mudou, mas parte das chaves já expirou no Redis
+        warmup.redis.expire_many.side_effect = [
+            ["name:https://swapi.info/api/people/1", "people"],
+            ["people_1_processed"],
+        ]
+
+        async def fetch(endpoint):
+            return planets_and_people[endpoint]
+
+        with patch.object(warmup, "_fetch_all_pages", side_effect=fetch):
+            report = await warmup.warm_all(incremental=True)
+
+        assert report["changed_items"] == 0
+        assert report["rewritten_expired_keys"] == 3
+        raw_call, processed_call = warmup.redis.set_many.await_args_list
+        assert raw_call.args[0] == {
+            "name:https://swapi.info/api/people/1": "Luke Skywalker",
+            "people": planets_and_people["people"],
+        }
+        person = loads_json(processed_call.args[0]["people_1_processed"])
+        assert person["homeworld"] == "Tatooine"
+
+
+class FakeWarmup:
+    def __init__(self, redis_cache, release):
+        self.endpoints = ["films", "people"]
+        self.release = release
+
+    async def warm_all(self, on_endpoint=None, incremental=False):
+        await on_endpoint(
+            {"endpoint": "films", "total_items": 6, "duration_seconds": 0.1}
+        )
+        # Segura o job em andamento até o teste liberar
+        await self.release.wait()
+        await on_endpoint(
+            {"endpoint": "people", "total_items": 82, "duration_seconds": 0.2}
+        )
+        return {"status": "completed", "total_cached": 88}
+
+
+class TestWarmupJobManager:
+    @pytest.mark.asyncio
+    async def test_job_runs_in_background_and_reports_progress(self, fake_redis_cache):
+        release = asyncio.Event()
+        manager = WarmupJobManager(
+            fake_redis_cache,
+            service_factory=lambda redis_cache: FakeWarmup(redis_cache, release),
+        )
+
+        job = await manager.start()
+        await asyncio.sleep(0.01)
+
+        running = await manager.get(job["job_id"])
+        assert running["status"] == "running"
+        assert running["endpoints"]["films"]["status"] == "done"
+        assert running["endpoints"]["people"]["status"] == "pending"
+        assert running["progress"]["endpoints_done"] == 1
+        assert running["progress"]["eta_seconds"] is not None
+
+        # Um segundo warm-up é recusado enquanto o primeiro segura o lock
+        with pytest.raises(WarmupAlreadyRunning) as exc_info:
+            await manager.start()
+        assert exc_info.value.job_id == job["job_id"]
+
+        release.set()
+        await asyncio.sleep(0.01)
+
+        finished = await manager.get(job["job_id"])
+        assert finished["status"] == "completed"
+        assert finished["report"]["total_cached"] == 88
+        assert finished["progress"]["items_fetched"] == 88
+        assert "lock:warmup" not in fake_redis_cache.connection.store
+
+    @pytest.mark.asyncio
+    async def test_stale_job_is_failed_and_releases_lock(self, fake_redis_cache):
+        # Job de um processo que morreu: segue "running", mas sem heartbeat
+        stale = {
+            "job_id": "dead",
+            "status": "running",
+            "started_at": time.time() - 600,
+            "updated_at": time.time() - 600,
+            "endpoints": {},
+            "lock_token": "dead-token",
+        }
+        await fake_redis_cache.set("warmup:job:dead", stale)
+        await fake_redis_cache.set(CURRENT_JOB_KEY, "dead")
+        fake_redis_cache.connection.store["lock:warmup"] = "dead-token"
+        manager = WarmupJobManager(
+            fake_redis_cache,
+            service_factory=lambda redis_cache: FakeWarmup(redis_cache, None),
+        )
+
+        assert (await manager.get("dead"))["status"] == "failed"
+        assert "lock_token" not in await manager.get("dead")
+        assert "lock:warmup" not in fake_redis_cache.connection.store
+
+        # Mesma situação, agora detectada por quem tenta iniciar outro warm-up
+        fake_redis_cache.connection.store["lock:warmup"] = "dead-token"
+        await fake_redis_cache.set("warmup:job:dead", stale)
+        await fake_redis_cache.set(CURRENT_JOB_KEY, "dead")
+        with patch.object(manager, "_run", new=AsyncMock()):
+            job = await manager.start()
+
+        assert job["job_id"] != "dead"
+        assert (await fake_redis_cache.get("warmup:job:dead"))["status"] == "failed"
+
+    @pytest.mark.asyncio
+    async def test_redis_down_is_not_reported_as_running(self, fake_redis_cache):
+        fake_redis_cache.connection = AsyncMock()
+        fake_redis_cache.connection.set.side_effect = ConnectionError("redis fora")
+
+        with pytest.raises(ConnectionError):
+            await WarmupJobManager(fake_redis_cache).start()
+
+    @pytest.mark.asyncio
+    async def test_inline_mode_finishes_before_returning(self, fake_redis_cache):
+        release = asyncio.Event()
+        release.set()
+        manager = WarmupJobManager(
+            fake_redis_cache,
+            service_factory=lambda redis_cache: FakeWarmup(redis_cache, release),
+            inline=True,
+        )
+
+        job = await manager.start()
+
+        assert job["status"] == "completed"
+        assert job["finished_at"] is not None
+        assert "lock_token" not in job
+        assert "lock:warmup" not in fake_redis_cache.connection.store
+
+    @pytest.mark.asyncio
+    async def test_unknown_job(self, fake_redis_cache):
+        assert await WarmupJobManager(fake_redis_cache).get("missing") is None
+
+    def test_job_progress_throughput_and_eta(self):
+        job = {
+            "status": "running",
+            "started_at": 100.0,
+            "finished_at": None,
+            "endpoints": {
+                "films": {"status": "done", "total_items": 6},
+                "people": {"status": "done", "total_items": 82},
+                "planets": {"status": "pending"},
+                "species": {"status": "pending"},
+            },
+        }
+
+        progress = job_progress(job, now=104.0)
+
+        assert progress["items_per_second"] == 22.0
+        assert progress["eta_seconds"] == 4.0